@@ -0,0 +1,73 @@
+import base64
+import binascii
+from typing import Any
+from uuid import uuid4
+
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+from recipes.images import RENDITIONS
+from recipes.models import Recipe
+
+# Кратно 4, чтобы каждый кусок декодировался независимо.
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+class Base64ImageField(serializers.ImageField):
+    """Картинка в виде data URL.
+
+    Base64 декодируется по частям во временный файл, поэтому полный
+    бинарный образ не держится в памяти, а FileSystemStorage
+    сохраняет файл перемещением, без копирования.
+    """
+
+    def to_internal_value(self, data: Any) -> Any:
+        if isinstance(data, str) and data.startswith("http"):
+            raise SkipField()
+        if isinstance(data, str) and data.startswith("data:"):
+            data = self.decode(data)
+        return super().to_internal_value(data)
+
+    def decode(self, data: str) -> TemporaryUploadedFile:
+        header, _, encoded = data.partition(";base64,")
+        content_type = header.partition(":")[2]
+        extension = content_type.split("/")[-1]
+        upload = TemporaryUploadedFile(
+            f"{uuid4()}.{extension}", content_type, 0, None
+        )
+        try:
+            for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+                end = start + BASE64_CHUNK_SIZE
+                upload.write(
+                    base64.b64decode(encoded[start:end], validate=True)
+                )
+        except binascii.Error:
+            upload.close()
+            self.fail("invalid_image")
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на превью картинки; пока превью не готово — на оригинал."""
+
+    def __init__(self, **kwargs) -> None:
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe: Recipe) -> dict:
+        if not recipe.image:
+            return {}
+        request = self.context.get("request")
+        renditions = {}
+        for name in RENDITIONS:
+            path = recipe.image_renditions.get(name)
+            url = default_storage.url(path) if path else recipe.image.url
+            renditions[name] = (
+                request.build_absolute_uri(url) if request else url
+            )
+        return renditions
@@ -1,13 +1,23 @@
 from typing import Any
 
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
+
+from django.db.models import Exists, OuterRef
 
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
+
 
+class StableOrderingFilter(filters.OrderingFilter):
+    """Сортировка с добавлением id, чтобы порядок страниц был стабильным."""
 
-class IngredientFilter(SearchFilter):
-    search_param = "name"
+    def filter(self, qs: Any, value: Any) -> Any:
+        qs = super().filter(qs, value)
+        if value:
+            ordering = qs.query.order_by
+            tiebreaker = "-id" if ordering[0].startswith("-") else "id"
+            qs = qs.order_by(*ordering, tiebreaker)
+        return qs
 
 
 class RecipeFilter(FilterSet):
@@ -15,6 +25,7 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
         field_name="tags__slug",
         to_field_name="slug",
+        method="filter_tags",
     )
     author = filters.CharFilter(lookup_expr="exact")
     is_in_shopping_cart = filters.BooleanFilter(
@@ -23,6 +34,14 @@ class RecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(
         field_name="is_favorited", method="filter"
     )
+    search = filters.CharFilter(method="filter_search")
+    ordering = StableOrderingFilter(
+        fields=(
+            ("created", "created"),
+            ("cooking_time", "cooking_time"),
+            ("favorites_count", "favorites"),
+        )
+    )
 
     class Meta:
         model = Recipe
@@ -31,13 +50,30 @@ class RecipeFilter(FilterSet):
             "tags",
             "is_in_shopping_cart",
             "is_favorited",
+            "search",
+            "ordering",
         )
 
     def filter(self, queryset: Any, name: str, value: Any) -> Any:
+        if not value:
+            return queryset
         if self.request.user.is_anonymous:
             return queryset.none()
-        if name == "is_in_shopping_cart" and value:
-            queryset = queryset.filter(wishlist_recipe__user=self.request.user)
-        if name == "is_favorited" and value:
-            queryset = queryset.filter(favorite_recipe__user=self.request.user)
-        return queryset
+        return queryset.filter(**{name: True})
+
+    def filter_tags(self, queryset: Any, name: str, value: list) -> Any:
+        """Полусоединение через EXISTS: рецепт с несколькими выбранными
+        тегами не дублируется, и DISTINCT не нужен."""
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef("pk"),
+                    tag_id__in=[tag.id for tag in value],
+                )
+            )
+        )
+
+    def filter_search(self, queryset: Any, name: str, value: str) -> Any:
+        return search_recipes(queryset, value)
@@ -0,0 +1,158 @@
+import hashlib
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from foodgram.middleware import current_profile
+from recipes.cache import get_table_version
+
+
+class ConditionalGetMixin:
+    """Условный GET для list и retrieve.
+
+    ETag строится из версий таблиц (condition_models), которые
+    сбрасываются сигналами, поэтому при совпадении If-None-Match
+    ответ 304 отдаётся без обращения к сериализатору.
+    """
+
+    condition_models = ()
+    cache_max_age = 60
+
+    def is_conditional(self, request: Any) -> bool:
+        return True
+
+    def get_last_modified(self, request: Any) -> datetime or None:
+        return None
+
+    def get_condition_versions(self, request: Any) -> list:
+        """Версии, из которых строится ETag; вызывается после
+        get_last_modified."""
+        return [
+            f"{model._meta.label_lower}:{get_table_version(model)}"
+            for model in self.condition_models
+        ]
+
+    def list(self, request: Any, *args, **kwargs) -> HttpResponse:
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request: Any, *args, **kwargs) -> HttpResponse:
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(
+        self, view: Any, request: Any, *args, **kwargs
+    ) -> HttpResponse:
+        if not self.is_conditional(request):
+            return view(request, *args, **kwargs)
+        last_modified = self.get_last_modified(request)
+        parts = self.get_condition_versions(request)
+        if last_modified:
+            parts.append(last_modified.isoformat())
+        parts.append(request.get_full_path())
+        parts.append(request.accepted_renderer.format)
+        etag = '"{}"'.format(hashlib.md5("|".join(parts).encode()).hexdigest())
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        response["ETag"] = etag
+        if timestamp:
+            response["Last-Modified"] = http_date(timestamp)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=self.cache_max_age
+            )
+        patch_vary_headers(response, ("Accept", "Authorization"))
+        return response
+
+
+class AnonymousListCacheMixin:
+    """Кэш готовых ответов list для анонимных пользователей.
+
+    Ответ гостям не зависит от пользователя, поэтому хранится целиком
+    по нормализованным параметрам запроса и версиям таблиц
+    (cache_models) и отдаётся без запросов к базе.
+    """
+
+    cache_models = ()
+    cache_format = "json"
+
+    def normalize_cache_params(self, request: Any) -> list:
+        return sorted(
+            (key, sorted(value for value in values if value))
+            for key, values in request.query_params.lists()
+            if any(values)
+        )
+
+    def get_list_cache_key(self, request: Any) -> str:
+        parts = [
+            f"{model._meta.label_lower}:{get_table_version(model)}"
+            for model in self.cache_models
+        ]
+        parts.append(request.get_host())
+        parts.append(request.path)
+        parts.append(repr(self.normalize_cache_params(request)))
+        digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+        return f"list-response:{digest}"
+
+    def list(self, request: Any, *args, **kwargs) -> HttpResponse:
+        if (
+            request.user.is_authenticated
+            or request.accepted_renderer.format != self.cache_format
+        ):
+            return super().list(request, *args, **kwargs)
+        key = self.get_list_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == 200:
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key,
+                        (rendered.content, rendered["Content-Type"]),
+                        settings.ANONYMOUS_CACHE_TIMEOUT,
+                    )
+                )
+        patch_cache_control(
+            response, public=True, max_age=settings.ANONYMOUS_CACHE_TIMEOUT
+        )
+        patch_vary_headers(response, ("Accept", "Authorization"))
+        return response
+
+
+class RequestProfileMixin:
+    """Отмечает для RequestProfilingMiddleware начало и конец
+    обработчика view, чтобы отделить его работу от запросов к базе."""
+
+    def initial(self, request: Any, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        profile = current_profile.get()
+        if profile is not None:
+            profile.start_view()
+
+    def finalize_response(
+        self, request: Any, response: HttpResponse, *args, **kwargs
+    ) -> HttpResponse:
+        profile = current_profile.get()
+        if profile is not None:
+            profile.finish_view()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,72 @@
+from typing import Any
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (
+    BasePagination, CursorPagination, PageNumberPagination,
+)
+from rest_framework.response import Response
+
+
+class QuerysetCursorPagination(CursorPagination):
+    """Курсор по текущей сортировке queryset (по умолчанию из Meta).
+
+    DRF ставит курсор только по первому полю сортировки, а внутри
+    совпадающих значений листает через OFFSET. Поэтому курсор разрешён
+    лишь для сортировок, где первое поле почти уникально.
+    """
+
+    cursor_fields = ("created", "id", "pk")
+
+    def get_ordering(self, request: Any, queryset: Any, view: Any) -> tuple:
+        ordering = tuple(
+            queryset.query.order_by or queryset.model._meta.ordering
+        ) or ("-pk",)
+        if ordering[0].lstrip("-") not in self.cursor_fields:
+            raise ValidationError(
+                {
+                    self.cursor_query_param: (
+                        "Курсорная пагинация доступна только при "
+                        "сортировке по дате публикации."
+                    )
+                }
+            )
+        return ordering
+
+
+class PageNumberOrCursorPagination(BasePagination):
+    """Постраничная пагинация, а при наличии ?cursor= — курсорная."""
+
+    def __init__(self) -> None:
+        self.cursor_paginator = QuerysetCursorPagination()
+        self.paginator = PageNumberPagination()
+
+    @property
+    def display_page_controls(self) -> bool:
+        return self.paginator.display_page_controls
+
+    def paginate_queryset(
+        self, queryset: Any, request: Any, view: Any = None
+    ) -> list or None:
+        cursor_query_param = self.cursor_paginator.cursor_query_param
+        if cursor_query_param in request.query_params:
+            self.paginator = self.cursor_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        return self.paginator.get_paginated_response(data)
+
+    def to_html(self) -> str:
+        return self.paginator.to_html()
+
+    def get_results(self, data: dict) -> list:
+        return self.paginator.get_results(data)
+
+    def get_schema_fields(self, view: Any) -> list:
+        return self.paginator.get_schema_fields(
+            view
+        ) + self.cursor_paginator.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view: Any) -> list:
+        return self.paginator.get_schema_operation_parameters(
+            view
+        ) + self.cursor_paginator.get_schema_operation_parameters(view)
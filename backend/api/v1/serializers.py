@@ -1,14 +1,55 @@
-from drf_base64.fields import Base64ImageField
+from functools import partial
+from typing import Any
+
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.db.models import Manager
+
+from recipes.cache import (
+    get_recipe_payload_keys, get_recipe_payloads, set_recipe_payloads,
+)
+from recipes.images import schedule_renditions
 from recipes.models import (
-    Favorite, Ingredient, Recipe, RecipeIngredient, Tag, Wishlist,
+    Favorite, Ingredient, MeasurementUnit, Recipe, RecipeIngredient, Tag,
+    Wishlist,
+)
+from recipes.recipe_index import (
+    delete_recipe_ingredients, invalidate_recipe_index,
 )
+from recipes.search import update_search_vector
+from recipes.shopping_list import (
+    get_wishlist_user_ids, lock_recipe, update_shopping_lists,
+)
+from recipes.utils import update_counter
 from users.models import Follow, User
 
+from .fields import Base64ImageField, ImageRenditionsField
+
+
+def get_subscribed_ids(request: Any) -> set:
+    """Id авторов, на которых подписан пользователь, один запрос на request."""
+    if not hasattr(request, "_subscribed_ids"):
+        request._subscribed_ids = set(
+            Follow.objects.filter(user=request.user).values_list(
+                "author_id", flat=True
+            )
+        )
+    return request._subscribed_ids
+
+
+def get_recipes_limit(request: Any) -> int or None:
+    if request is None:
+        return None
+    recipes_limit = request.query_params.get("recipes_limit")
+    if recipes_limit and recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
 
 class UserSerializer(serializers.ModelSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
@@ -47,15 +88,15 @@ class UserSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            user=request.user, author=data.id
-        ).exists()
+        return data.id in get_subscribed_ids(request)
 
 
 class RecipeAnswerSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_renditions", "cooking_time")
 
 
 class FollowUserSerializer(UserSerializer):
@@ -77,12 +118,12 @@ class FollowUserSerializer(UserSerializer):
 
     def get_recipes(self, obj: User) -> dict:
         request = self.context.get("request")
-        recipes_limit = None
-        if request:
-            recipes_limit = request.query_params.get("recipes_limit")
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = obj.recipes.all()[: int(recipes_limit)]
+        recipes = getattr(obj, "limited_recipes", None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return RecipeAnswerSerializer(
             recipes, many=True, context={"request": request}
         ).data
@@ -128,6 +169,10 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class IngredientSerializer(serializers.ModelSerializer):
+    measurement_unit = serializers.SlugRelatedField(
+        slug_field="name", queryset=MeasurementUnit.objects.all()
+    )
+
     class Meta:
         model = Ingredient
         fields = (
@@ -137,6 +182,14 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Строка списка покупок, сведённая к базовой единице измерения."""
+
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField()
+    total_amount = serializers.IntegerField()
+
+
 class RecipeIngredientPostSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField()
     amount = serializers.IntegerField()
@@ -150,7 +203,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source="ingredient.id")
     name = serializers.ReadOnlyField(source="ingredient.name")
     measurement_unit = serializers.ReadOnlyField(
-        source="ingredient.measurement_unit"
+        source="ingredient.measurement_unit.name"
     )
 
     class Meta:
@@ -178,6 +231,12 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         return recipe_ingredient
 
 
+class RecipeGetListSerializer(serializers.ListSerializer):
+    def to_representation(self, data: Any) -> list:
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.to_cached_representations(list(recipes))
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer(read_only=True)
@@ -187,6 +246,7 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -199,26 +259,71 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             "ingredients",
             "tags",
             "image",
+            "image_renditions",
             "is_favorited",
             "is_in_shopping_cart",
         )
+        list_serializer_class = RecipeGetListSerializer
 
-    def get_is_favorited(self, obj: Recipe) -> bool:
+    def to_representation(self, instance: Recipe) -> dict:
+        return self.to_cached_representations([instance])[0]
+
+    def to_cached_representations(self, recipes: list) -> list:
+        """Общая для всех пользователей часть берётся из кэша.
+
+        Поля, зависящие от пользователя, не кэшируются и
+        подставляются при каждом ответе.
+        """
         request = self.context.get("request")
-        return (
-            request
-            and request.user.is_authenticated
-            and Favorite.objects.filter(user=request.user, recipe=obj).exists()
+        host = request.get_host() if request else ""
+        keys = get_recipe_payload_keys(recipes, host)
+        cached = get_recipe_payloads(list(keys.values()))
+        missing = {}
+        representations = []
+        for recipe in recipes:
+            payload = cached.get(keys[recipe.id])
+            if payload is None:
+                payload = super().to_representation(recipe)
+                payload.pop("is_favorited")
+                payload.pop("is_in_shopping_cart")
+                payload["author"].pop("is_subscribed")
+                missing[keys[recipe.id]] = payload
+            representations.append(self.add_user_fields(recipe, payload))
+        set_recipe_payloads(missing)
+        return representations
+
+    def add_user_fields(self, recipe: Recipe, payload: dict) -> dict:
+        representation = dict(payload)
+        representation["author"] = dict(
+            payload["author"],
+            is_subscribed=self.fields["author"].get_is_subscribed(
+                recipe.author
+            ),
+        )
+        representation["is_favorited"] = self.get_is_favorited(recipe)
+        representation["is_in_shopping_cart"] = self.get_is_in_shopping_cart(
+            recipe
         )
+        return representation
 
-    def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
+    def _get_relation_flag(
+        self, obj: Recipe, model: Any, annotation: str
+    ) -> bool:
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
         request = self.context.get("request")
-        return (
+        return bool(
             request
             and request.user.is_authenticated
-            and Wishlist.objects.filter(user=request.user, recipe=obj).exists()
+            and model.objects.filter(user=request.user, recipe=obj).exists()
         )
 
+    def get_is_favorited(self, obj: Recipe) -> bool:
+        return self._get_relation_flag(obj, Favorite, "is_favorited")
+
+    def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
+        return self._get_relation_flag(obj, Wishlist, "is_in_shopping_cart")
+
 
 class RecipeSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
@@ -243,6 +348,14 @@ class RecipeSerializer(serializers.ModelSerializer):
             "image",
         )
 
+    def save(self, **kwargs) -> Recipe:
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get("image")
+            if isinstance(image, TemporaryUploadedFile):
+                image.close()
+
     def validate(self, data: dict) -> dict or ValidationError:
         if self.instance:
             return data
@@ -268,16 +381,19 @@ class RecipeSerializer(serializers.ModelSerializer):
         serializer = RecipeGetSerializer(instance, context=self.context)
         return serializer.data
 
-    def validate_ingredient(self, data: dict) -> dict or ValidationError:
-        ingredients = data.get("ingredients")
-        unique_ingredients = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient.get("id")
-            if ingredient_id not in unique_ingredients:
-                unique_ingredients.append(ingredient_id)
-            else:
-                raise ValidationError("Ингредиент уже добавлен.")
-        return data
+    def validate_ingredients(self, value: list) -> list or ValidationError:
+        ingredient_ids = [ingredient.get("id") for ingredient in value]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise ValidationError("Ингредиент уже добавлен.")
+        existing_ids = set(
+            Ingredient.objects.filter(id__in=ingredient_ids).values_list(
+                "id", flat=True
+            )
+        )
+        missing_ids = sorted(set(ingredient_ids) - existing_ids)
+        if missing_ids:
+            raise ValidationError(f"Ингредиенты не найдены: {missing_ids}")
+        return value
 
     def validate_time(self, data: dict) -> dict or ValidationError:
         if int(data.get("cooking_time")) <= 1:
@@ -285,13 +401,60 @@ class RecipeSerializer(serializers.ModelSerializer):
         return data
 
     def create_ingredient(self, recipe: Recipe, ingredients: list) -> None:
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredient_id=ingredient.get("id"),
                 amount=ingredient.get("amount"),
             )
+            for ingredient in ingredients
+        )
+
+    def update_ingredient(self, recipe: Recipe, ingredients: list) -> None:
+        amounts = {
+            ingredient.get("id"): ingredient.get("amount")
+            for ingredient in ingredients
+        }
+        lock_recipe(recipe.id)
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe_id=recipe.id
+            )
+        }
+        deltas = {
+            ingredient_id: amounts.get(ingredient_id, 0)
+            - getattr(existing.get(ingredient_id), "amount", 0)
+            for ingredient_id in amounts.keys() | existing.keys()
+        }
+        update_shopping_lists(get_wishlist_user_ids(recipe.id), deltas)
+        removed_ids = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in existing.items()
+            if ingredient_id not in amounts
+        ]
+        if removed_ids:
+            delete_recipe_ingredients(
+                RecipeIngredient.objects.filter(id__in=removed_ids)
+            )
+        changed = []
+        for ingredient_id, recipe_ingredient in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        self.create_ingredient(
+            recipe,
+            [
+                ingredient
+                for ingredient in ingredients
+                if ingredient.get("id") not in existing
+            ],
+        )
 
+    @transaction.atomic
     def create(self, validated_data: dict) -> Recipe:
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
@@ -302,13 +465,33 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         new_recipe.tags.set(tags)
         self.create_ingredient(new_recipe, ingredients)
+        transaction.on_commit(partial(invalidate_recipe_index, new_recipe.id))
+        update_search_vector([new_recipe.id])
+        update_counter(User, author.id, "recipes_count", 1)
+        if new_recipe.image:
+            schedule_renditions(new_recipe.id)
         return new_recipe
 
+    @transaction.atomic
     def update(self, recipe: Recipe, validated_data: dict) -> Recipe:
-        if validated_data.get("ingredients"):
-            ingredients = validated_data.pop("ingredients")
-            recipe.recipes_ingredient.all().delete()
-            self.create_ingredient(recipe, ingredients)
+        ingredients = validated_data.pop("ingredients", None)
+        if ingredients:
+            self.update_ingredient(recipe, ingredients)
+            transaction.on_commit(partial(invalidate_recipe_index, recipe.id))
         tags = validated_data.pop("tags")
         recipe.tags.set(tags)
+        if validated_data.get("image"):
+            recipe.image_renditions = {}
+            schedule_renditions(recipe.id)
         return super().update(recipe, validated_data)
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, required=False, allow_null=True
+    )
@@ -1,40 +1,88 @@
+from datetime import datetime
+from functools import partial
 from typing import Any
 
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (
     IsAuthenticated, IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from django.db.models import Count, Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Exists, OuterRef, Prefetch, Subquery, Value,
+)
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from recipes.models import Favorite, Ingredient, Recipe, Tag, Wishlist
-from recipes.utils import generate_shopping_cart
+from foodgram.renderers import CSVRenderer, PlainTextRenderer
+from recipes.cache import get_recipe_versions
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, Tag, Wishlist,
+)
+from recipes.recipe_index import (
+    delete_recipe_ingredients, invalidate_recipe_index, recipe_index,
+)
+from recipes.shopping_list import (
+    add_recipe, get_recipe_amounts, get_shopping_list, get_wishlist_user_ids,
+    lock_recipe, update_shopping_lists,
+)
+from recipes.utils import (
+    SHOPPING_CART_CHUNK_SIZE, generate_shopping_cart, update_counter,
+)
 from users.models import Follow, User
 
-from .filters import IngredientFilter, RecipeFilter
+from .filters import RecipeFilter
+from .mixins import (
+    AnonymousListCacheMixin, ConditionalGetMixin, RequestProfileMixin,
+)
+from .pagination import PageNumberOrCursorPagination
 from .serializers import (
-    FollowSerializer, FollowUserSerializer, IngredientSerializer,
-    RecipeAnswerSerializer, RecipeGetSerializer, RecipeSerializer,
-    TagSerializer,
+    CookableQuerySerializer, FollowSerializer, FollowUserSerializer,
+    IngredientSerializer, RecipeAnswerSerializer, RecipeGetSerializer,
+    RecipeSerializer, ShoppingListItemSerializer, TagSerializer,
+    get_recipes_limit,
 )
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(RequestProfileMixin, UserViewSet):
+    pagination_class = PageNumberOrCursorPagination
+
     @action(
         detail=False,
         methods=["get"],
     )
     def subscriptions(self, request: HttpResponse) -> HttpResponse:
+        recipes = Recipe.objects.only(
+            "id",
+            "author_id",
+            "name",
+            "image",
+            "image_renditions",
+            "cooking_time",
+            "created",
+        )
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            latest = Recipe.objects.filter(author=OuterRef("author")).values(
+                "pk"
+            )[:recipes_limit]
+            recipes = recipes.filter(pk__in=Subquery(latest))
         queryset = (
             User.objects.filter(following__user=request.user.id)
             .order_by("id")
-            .annotate(recipes_count=Count("recipes"))
+            .prefetch_related(
+                Prefetch(
+                    "recipes", queryset=recipes, to_attr="limited_recipes"
+                )
+            )
         )
         page = self.paginate_queryset(queryset)
         serializer = FollowUserSerializer(
@@ -56,42 +104,159 @@ class UserViewSet(UserViewSet):
                 context={"request": request},
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                update_counter(User, author.id, "followers_count", 1)
             serializer = FollowUserSerializer(
                 author, context={"request": request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         elif request.method == "DELETE":
-            if Follow.objects.filter(
-                author=author, user=request.user
-            ).delete()[0]:
+            with transaction.atomic():
+                deleted = Follow.objects.filter(
+                    author=author, user=request.user
+                ).delete()[0]
+                if deleted:
+                    update_counter(User, author.id, "followers_count", -1)
+            if deleted:
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(
+    RequestProfileMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
+    condition_models = (Tag,)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(
+    RequestProfileMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    filter_backends = (IngredientFilter,)
-    search_fields = ("^name",)
     queryset = Ingredient.objects.all()
     pagination_class = None
+    condition_models = (Ingredient,)
+
+    def list(self, request: HttpResponse, *args, **kwargs) -> HttpResponse:
+        return self.conditional_response(self.list_from_index, request)
+
+    def list_from_index(self, request: HttpResponse) -> HttpResponse:
+        ingredients = ingredient_index.search(
+            request.query_params.get("name", ""),
+            settings.INGREDIENT_SEARCH_LIMIT,
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    RequestProfileMixin,
+    AnonymousListCacheMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    queryset = Recipe.objects.select_related("author").prefetch_related(
-        "tags", "ingredients"
-    )
+    pagination_class = PageNumberOrCursorPagination
+    condition_models = (Tag, Ingredient)
+    cache_models = (Recipe, Tag, Ingredient, User)
+    condition_author_id = None
+
+    def normalize_cache_params(self, request: HttpResponse) -> list:
+        """Ложные флаги гостям ничего не фильтруют и в ключ не входят."""
+        return [
+            (key, values)
+            for key, values in super().normalize_cache_params(request)
+            if not (
+                key in ("is_favorited", "is_in_shopping_cart")
+                and values[-1].lower() in ("0", "false")
+            )
+        ]
+
+    def is_conditional(self, request: HttpResponse) -> bool:
+        return self.action == "retrieve" and request.user.is_anonymous
+
+    def get_last_modified(self, request: HttpResponse) -> datetime or None:
+        try:
+            recipe = (
+                Recipe.objects.filter(pk=self.kwargs["pk"])
+                .values_list("updated", "author_id")
+                .first()
+            )
+        except ValueError:
+            return None
+        if recipe is None:
+            return None
+        last_modified, self.condition_author_id = recipe
+        return last_modified
+
+    def get_condition_versions(self, request: HttpResponse) -> list:
+        """Версия рецепта меняется и при правке ингредиентов, которая
+        не трогает Recipe.updated; вместо версии всей таблицы
+        пользователей — версия автора."""
+        versions = super().get_condition_versions(request)
+        if self.condition_author_id:
+            recipe_version, author_version = get_recipe_versions(
+                self.kwargs["pk"], self.condition_author_id
+            )
+            versions.append(f"recipe:{recipe_version}")
+            versions.append(f"author:{author_version}")
+        return versions
+
+    def get_queryset(self) -> Any:
+        queryset = (
+            Recipe.objects.select_related("author")
+            .prefetch_related(
+                "tags",
+                Prefetch(
+                    "recipes_ingredient",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient__measurement_unit"
+                    ),
+                ),
+            )
+            .defer("search_vector")
+        )
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                Wishlist.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance: Recipe) -> None:
+        author_id = instance.author_id
+        lock_recipe(instance.id)
+        update_shopping_lists(
+            get_wishlist_user_ids(instance.id),
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount in get_recipe_amounts(
+                    instance.id
+                ).items()
+            },
+        )
+        delete_recipe_ingredients(
+            RecipeIngredient.objects.filter(recipe_id=instance.id)
+        )
+        transaction.on_commit(partial(invalidate_recipe_index, instance.id))
+        instance.delete()
+        update_counter(User, author_id, "recipes_count", -1)
 
     def get_serializer_class(self) -> RecipeSerializer:
         if self.action in ["list", "retrieve"]:
@@ -103,7 +268,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=["post", "delete"],
     )
     def favorite(self, request: HttpResponse, pk: int) -> HttpResponse:
-        return self._toggle_relation(Favorite, request, pk)
+        return self._toggle_relation(Favorite, request, pk, "favorites_count")
 
     @action(
         detail=True,
@@ -111,10 +276,45 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def shopping_cart(self, request: HttpResponse, pk: int) -> HttpResponse:
-        return self._toggle_relation(Wishlist, request, pk)
+        return self._toggle_relation(Wishlist, request, pk, "wishlist_count")
+
+    @action(detail=False, pagination_class=PageNumberPagination)
+    def what_can_i_cook(self, request: HttpResponse) -> HttpResponse:
+        """Рецепты по имеющимся ингредиентам: сначала те, для которых
+        есть наибольшая доля ингредиентов."""
+        params = CookableQuerySerializer(
+            data={
+                "ingredients": [
+                    ingredient_id
+                    for value in request.query_params.getlist("ingredients")
+                    for ingredient_id in value.split(",")
+                ],
+                "max_missing": request.query_params.get("max_missing"),
+            }
+        )
+        params.is_valid(raise_exception=True)
+        matches = self.paginate_queryset(
+            recipe_index.match(
+                set(params.validated_data["ingredients"]),
+                params.validated_data.get("max_missing"),
+            )
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        matches = [match for match in matches if match[0] in recipes]
+        data = RecipeGetSerializer(
+            [recipes[recipe_id] for recipe_id, _, _ in matches],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        for item, (_, matched, total) in zip(data, matches):
+            item["coverage"] = round(matched / total, 3)
+            item["missing_count"] = total - matched
+        return self.get_paginated_response(data)
 
     def _toggle_relation(
-        self, model: Any, request: HttpResponse, pk: int
+        self, model: Any, request: HttpResponse, pk: int, counter: str
     ) -> HttpResponse:
         recipe = get_object_or_404(Recipe, id=pk)
         serializer = RecipeAnswerSerializer(
@@ -122,30 +322,65 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         user = request.user
         if request.method == "POST":
-            model.objects.get_or_create(user=user, recipe=recipe)
+            with transaction.atomic():
+                if model is Wishlist:
+                    lock_recipe(recipe.id)
+                _, created = model.objects.get_or_create(
+                    user=user, recipe=recipe
+                )
+                if created:
+                    update_counter(Recipe, recipe.id, counter, 1)
+                    if model is Wishlist:
+                        add_recipe(user.id, recipe.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         elif request.method == "DELETE":
-            if model.objects.filter(user=user, recipe=recipe).delete()[0]:
+            with transaction.atomic():
+                if model is Wishlist:
+                    lock_recipe(recipe.id)
+                deleted = model.objects.filter(
+                    user=user, recipe=recipe
+                ).delete()[0]
+                if deleted:
+                    update_counter(Recipe, recipe.id, counter, -1)
+                    if model is Wishlist:
+                        add_recipe(user.id, recipe.id, sign=-1)
+            if deleted:
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(status=status.HTTP_404_NOT_FOUND)
 
     @action(
         detail=False,
         methods=["get"],
+        url_path="shopping_cart",
+        url_name="shopping-cart-items",
         permission_classes=[IsAuthenticated],
+        pagination_class=None,
     )
-    def download_shopping_cart(self, request: HttpResponse) -> HttpResponse:
-        ingredients = (
-            Wishlist.objects.filter(user=request.user)
-            .values(
-                "recipe__recipes_ingredient__ingredient__name",
-                "recipe__recipes_ingredient__ingredient__measurement_unit",
-            )
-            .annotate(total_amount=Sum("recipe__recipes_ingredient__amount"))
+    def view_shopping_cart(self, request: HttpResponse) -> HttpResponse:
+        serializer = ShoppingListItemSerializer(
+            get_shopping_list(request.user.id), many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer],
+    )
+    def download_shopping_cart(
+        self, request: HttpResponse
+    ) -> StreamingHttpResponse:
+        renderer = request.accepted_renderer
+        ingredients = get_shopping_list(request.user.id)
+        response = StreamingHttpResponse(
+            generate_shopping_cart(
+                ingredients.iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE),
+                renderer.format,
+            ),
+            content_type=f"{renderer.media_type}; charset=utf-8",
         )
-        buffer = generate_shopping_cart(ingredients)
-        response = HttpResponse(buffer.getvalue(), content_type="text/plain")
         response[
             "Content-Disposition"
-        ] = "attachment; filename=shopping_cart.txt"
+        ] = f"attachment; filename=shopping_cart.{renderer.format}"
         return response
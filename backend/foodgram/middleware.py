@@ -0,0 +1,192 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Запросы к базе и время работы view одного HTTP-запроса."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.view = None
+        self.queries = Counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.app_time = 0.0
+        self._view_started = None
+        self._view_db_time = 0.0
+
+    def execute(
+        self, execute: Callable, sql: str, params: Any, many: bool, context
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.queries[sql] += 1
+
+    def start_view(self) -> None:
+        self._view_started = time.perf_counter()
+        self._view_db_time = self.db_time
+
+    def finish_view(self) -> None:
+        """Время обработчика view без запросов к базе: фильтрация,
+        пагинация, права и сериализация; рендеринг JSON идёт позже
+        и сюда не входит."""
+        if self._view_started is None:
+            return
+        elapsed = time.perf_counter() - self._view_started
+        self.app_time += elapsed - (self.db_time - self._view_db_time)
+        self._view_started = None
+
+    def duplicates(self) -> list:
+        """Одинаковый SQL с разными параметрами — признак N+1."""
+        return [
+            (sql, count)
+            for sql, count in self.queries.most_common()
+            if count >= settings.REQUEST_PROFILING_DUPLICATES
+        ]
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            (
+                f'db;dur={self.db_time * 1000:.1f};desc="'
+                f'{self.query_count} queries"',
+                f'app;dur={self.app_time * 1000:.1f};desc="view without db"',
+                f"total;dur={self.elapsed() * 1000:.1f}",
+            )
+        )
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def get_view_name(view_func: Callable, request: HttpRequest) -> str:
+    """api.v1.views.RecipeViewSet.list для viewset, путь к функции
+    для остальных представлений."""
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__qualname__}"
+    name = f"{view_class.__module__}.{view_class.__name__}"
+    action = (getattr(view_func, "actions", None) or {}).get(
+        request.method.lower()
+    )
+    return f"{name}.{action}" if action else name
+
+
+class RequestProfilingMiddleware:
+    """Число и время запросов к базе, время работы view без базы
+    и размер ответа для каждого запроса.
+
+    Включается переменной окружения REQUEST_PROFILING=True. Итоги
+    отдаются в заголовке Server-Timing и пишутся строкой JSON в лог;
+    повторяющийся SQL отмечается предупреждением с именем view.
+    Границы обработчика отмечают viewset'ы API через
+    RequestProfileMixin.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            with self.record_queries(profile):
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        response["Server-Timing"] = profile.server_timing()
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, profile
+            )
+        else:
+            self.log(request, response, profile, len(response.content))
+        return response
+
+    def process_view(
+        self, request: HttpRequest, view_func: Callable, *args
+    ) -> None:
+        current_profile.get().view = get_view_name(view_func, request)
+
+    @contextmanager
+    def record_queries(self, profile: RequestProfile) -> Iterator[None]:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(profile.execute)
+                )
+            yield
+
+    def stream(
+        self,
+        content: Iterator[bytes],
+        request: HttpRequest,
+        response: HttpResponse,
+        profile: RequestProfile,
+    ) -> Iterator[bytes]:
+        """Потоковый ответ читает базу уже после выхода из view, поэтому
+        запросы считаются до конца отдачи, а лог пишется в конце."""
+        size = 0
+        with self.record_queries(profile):
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        self.log(request, response, profile, size)
+
+    def log(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        profile: RequestProfile,
+        size: int,
+    ) -> None:
+        duplicates = profile.duplicates()
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "view": profile.view,
+                    "status": response.status_code,
+                    "queries": profile.query_count,
+                    "db_ms": round(profile.db_time * 1000, 1),
+                    "app_ms": round(profile.app_time * 1000, 1),
+                    "total_ms": round(profile.elapsed() * 1000, 1),
+                    "size": size,
+                    "duplicate_queries": sum(count for _, count in duplicates),
+                },
+                ensure_ascii=False,
+            )
+        )
+        for sql, count in duplicates:
+            logger.warning(
+                json.dumps(
+                    {
+                        "event": "duplicate_sql",
+                        "view": profile.view,
+                        "path": request.path,
+                        "count": count,
+                        "sql": sql,
+                    },
+                    ensure_ascii=False,
+                )
+            )
@@ -12,3 +12,8 @@ class PlainTextRenderer(renderers.BaseRenderer):
         if isinstance(data, dict):
             data = str(data)
         return data.encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = "text/csv"
+    format = "csv"
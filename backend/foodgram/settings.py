@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "djoser",
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "foodgram.middleware.RequestProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -95,6 +97,22 @@ DATABASES = {
         ),
     }
 }
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION",
+            "",
+        ),
+    }
+}
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", 60 * 60 * 24))
+ANONYMOUS_CACHE_TIMEOUT = int(os.getenv("ANONYMOUS_CACHE_TIMEOUT", 30))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -150,6 +168,38 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 6,
 }
 
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_FETCH_WORKERS = int(os.getenv("IMAGE_FETCH_WORKERS", 8))
+IMAGE_FETCH_MAX_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", 10 * 1024**2))
+IMAGE_FETCH_CONNECT_TIMEOUT = float(
+    os.getenv("IMAGE_FETCH_CONNECT_TIMEOUT", 3)
+)
+IMAGE_FETCH_READ_TIMEOUT = float(os.getenv("IMAGE_FETCH_READ_TIMEOUT", 10))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 50))
+
+RECIPE_SEARCH_CONFIG = os.getenv("RECIPE_SEARCH_CONFIG", "russian")
+
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", default="False") == "True"
+REQUEST_PROFILING_DUPLICATES = int(
+    os.getenv("REQUEST_PROFILING_DUPLICATES", 3)
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "foodgram.middleware": {
+            "handlers": ("console",),
+            "level": os.getenv("REQUEST_PROFILING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     "HIDE_USER": "True",
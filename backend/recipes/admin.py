@@ -1,10 +1,17 @@
+from functools import partial
+
 from djaa_list_filter.admin import AjaxAutocompleteListFilterModelAdmin
 
 from django.contrib import admin
+from django.db import transaction
 
+from .cache import bump_recipe_version
 from .models import (
-    Favorite, Ingredient, Recipe, RecipeIngredient, Tag, Wishlist,
+    Favorite, Ingredient, MeasurementUnit, Recipe, RecipeIngredient, Tag,
+    Wishlist,
 )
+from .recipe_index import delete_recipe_ingredients, invalidate_recipe_index
+from .search import update_search_vector
 
 
 @admin.register(Tag)
@@ -27,10 +34,15 @@ class RecipeAdmin(AjaxAutocompleteListFilterModelAdmin):
     ]
     autocomplete_list_filter = ("author", "tags")
 
+    def save_related(self, request: admin.ModelAdmin, form, *args) -> None:
+        super().save_related(request, form, *args)
+        update_search_vector([form.instance.id])
+
     def count_favorites(self, obj: Recipe) -> int:
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     count_favorites.short_description = "Сохранено"
+    count_favorites.admin_order_field = "favorites_count"
 
     def get_queryset(self, request: admin.ModelAdmin) -> Recipe:
         qs = super().get_queryset(request)
@@ -49,11 +61,41 @@ class RecipeIngredientAdmin(AjaxAutocompleteListFilterModelAdmin):
         qs = super().get_queryset(request)
         return qs.select_related("recipe", "ingredient")
 
+    def save_model(
+        self, request: admin.ModelAdmin, obj: RecipeIngredient, *args
+    ) -> None:
+        super().save_model(request, obj, *args)
+        update_search_vector([obj.recipe_id])
+
+    def delete_model(
+        self, request: admin.ModelAdmin, obj: RecipeIngredient
+    ) -> None:
+        super().delete_model(request, obj)
+        update_search_vector([obj.recipe_id])
+
+    def delete_queryset(
+        self, request: admin.ModelAdmin, queryset: RecipeIngredient
+    ) -> None:
+        recipe_ids = set(queryset.values_list("recipe_id", flat=True))
+        delete_recipe_ingredients(queryset)
+        update_search_vector(recipe_ids)
+        transaction.on_commit(partial(invalidate_recipe_index, *recipe_ids))
+        transaction.on_commit(partial(bump_recipe_version, *recipe_ids))
+
+
+@admin.register(MeasurementUnit)
+class MeasurementUnitAdmin(admin.ModelAdmin):
+    list_display = ["name", "base", "factor"]
+    list_select_related = ["base"]
+    search_fields = ["name"]
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ["name", "measurement_unit"]
-    search_fields = ["name"]
+    list_select_related = ["measurement_unit"]
+    list_filter = ["measurement_unit"]
+    search_fields = ["^name"]
 
 
 @admin.register(Favorite)
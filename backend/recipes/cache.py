@@ -0,0 +1,102 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+
+from recipes.models import Ingredient, Tag
+
+TABLE_VERSION_KEY = "table-version:{}"
+RECIPE_VERSION_KEY = "recipe-version:{}"
+AUTHOR_VERSION_KEY = "author-version:{}"
+RECIPE_PAYLOAD_KEY = "recipe-payload:{}:{}:{}:{}:{}"
+
+
+def get_table_version(model: Model) -> str:
+    key = TABLE_VERSION_KEY.format(model._meta.label_lower)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_table_version(model: Model) -> None:
+    cache.set(
+        TABLE_VERSION_KEY.format(model._meta.label_lower),
+        uuid4().hex,
+        timeout=None,
+    )
+
+
+def bump_versions(key_template: str, *ids: int) -> None:
+    cache.set_many(
+        {key_template.format(pk): uuid4().hex for pk in ids}, timeout=None
+    )
+
+
+def bump_recipe_version(*recipe_ids: int) -> None:
+    bump_versions(RECIPE_VERSION_KEY, *recipe_ids)
+
+
+def bump_author_version(*author_ids: int) -> None:
+    bump_versions(AUTHOR_VERSION_KEY, *author_ids)
+
+
+def get_versions(keys: set) -> dict:
+    """Версии по ключам кэша; недостающие создаются."""
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def get_recipe_versions(recipe_id: int, author_id: int) -> tuple:
+    """Версии рецепта и его автора одним обращением к кэшу."""
+    keys = (
+        RECIPE_VERSION_KEY.format(recipe_id),
+        AUTHOR_VERSION_KEY.format(author_id),
+    )
+    versions = get_versions(set(keys))
+    return tuple(versions[key] for key in keys)
+
+
+def get_recipe_payload_keys(recipes: list, host: str) -> dict:
+    """Ключи кэша представлений рецептов: id рецепта -> ключ.
+
+    В ключ входят версии рецепта и его автора и версии таблиц тегов и
+    ингредиентов, поэтому любое их изменение делает старую запись
+    недостижимой. Правка профиля сбрасывает только рецепты автора.
+    """
+    version_keys = {
+        recipe.id: (
+            RECIPE_VERSION_KEY.format(recipe.id),
+            AUTHOR_VERSION_KEY.format(recipe.author_id),
+        )
+        for recipe in recipes
+    }
+    versions = get_versions(
+        {key for keys in version_keys.values() for key in keys}
+    )
+    tables = ":".join(get_table_version(model) for model in (Tag, Ingredient))
+    return {
+        recipe_id: RECIPE_PAYLOAD_KEY.format(
+            recipe_id,
+            versions[recipe_key],
+            versions[author_key],
+            tables,
+            host,
+        )
+        for recipe_id, (recipe_key, author_key) in version_keys.items()
+    }
+
+
+def get_recipe_payloads(keys: list) -> dict:
+    return cache.get_many(keys)
+
+
+def set_recipe_payloads(payloads: dict) -> None:
+    if payloads:
+        cache.set_many(payloads, timeout=settings.RECIPE_CACHE_TIMEOUT)
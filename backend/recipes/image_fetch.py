@@ -0,0 +1,135 @@
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+class ImageFetcher:
+    """Загрузка картинок рецептов по URL.
+
+    Использует общий пул соединений с таймаутами, читает ответ
+    потоком с ограничением размера и сохраняет файл в хранилище поля
+    Recipe.image: имя по содержимому и повтор загрузки той же картинки
+    решает ContentAddressedStorage.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        timeout: tuple,
+        max_workers: int,
+        storage: Storage = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.field = Recipe._meta.get_field("image")
+        self.storage = storage or self.field.storage
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=("GET",),
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-fetch"
+        )
+
+    def fetch(self, url: str) -> str:
+        """Скачивает картинку и возвращает её имя в хранилище."""
+        try:
+            with self.session.get(
+                url, stream=True, timeout=self.timeout
+            ) as response:
+                extension = self._check_response(url, response)
+                with tempfile.TemporaryFile() as buffer:
+                    self._download(url, response, buffer)
+                    buffer.seek(0)
+                    name = self.storage.save(
+                        self.field.generate_filename(
+                            None, f"image.{extension}"
+                        ),
+                        File(buffer),
+                    )
+        except requests.RequestException as error:
+            raise ImageFetchError(f"{url}: {error}") from error
+        return name
+
+    def fetch_many(self, urls: list) -> dict:
+        """Параллельная загрузка: URL -> имя файла или ImageFetchError."""
+        futures = {url: self.executor.submit(self.fetch, url) for url in urls}
+        results = {}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except ImageFetchError as error:
+                logger.warning("Не удалось загрузить картинку: %s", error)
+                results[url] = error
+        return results
+
+    def _check_response(self, url: str, response: requests.Response) -> str:
+        if response.status_code != HTTPStatus.OK:
+            raise ImageFetchError(f"{url}: HTTP {response.status_code}")
+        content_type = (
+            response.headers.get("content-type", "").split(";")[0].strip()
+        )
+        if content_type not in IMAGE_CONTENT_TYPES:
+            raise ImageFetchError(f"{url}: unsupported {content_type!r}")
+        content_length = response.headers.get("content-length")
+        if content_length and int(content_length) > self.max_bytes:
+            raise ImageFetchError(f"{url}: {content_length} bytes is too big")
+        return content_type.split("/")[-1]
+
+    def _download(
+        self, url: str, response: requests.Response, buffer: File
+    ) -> None:
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ImageFetchError(
+                    f"{url}: more than {self.max_bytes} bytes"
+                )
+            buffer.write(chunk)
+
+
+_fetcher = None
+
+
+def get_image_fetcher() -> ImageFetcher:
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = ImageFetcher(
+            max_bytes=settings.IMAGE_FETCH_MAX_BYTES,
+            timeout=(
+                settings.IMAGE_FETCH_CONNECT_TIMEOUT,
+                settings.IMAGE_FETCH_READ_TIMEOUT,
+            ),
+            max_workers=settings.IMAGE_FETCH_WORKERS,
+        )
+    return _fetcher
@@ -0,0 +1,97 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from recipes.cache import bump_recipe_version
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = "recipes/renditions"
+RENDITIONS = {
+    "card": ((480, 320), "JPEG", True),
+    "detail": ((1024, 1024), "JPEG", False),
+    "webp": ((480, 320), "WEBP", True),
+}
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS, thread_name_prefix="renditions"
+)
+
+
+def render(
+    image: Image.Image, size: tuple, image_format: str, crop: bool
+) -> ContentFile:
+    if crop:
+        result = ImageOps.fit(image, size, Image.LANCZOS)
+    else:
+        result = image.copy()
+        result.thumbnail(size, Image.LANCZOS)
+    if result.mode not in ("RGB", "L"):
+        result = result.convert("RGB")
+    buffer = BytesIO()
+    result.save(buffer, image_format, quality=85, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def get_renditions_dir(image_name: str) -> str:
+    """Картинки называются по хешу содержимого, поэтому превью
+    неизменяемы и лежат в каталоге с именем исходного файла."""
+    return f"{RENDITIONS_DIR}/{os.path.basename(image_name)}"
+
+
+def generate_renditions(recipe_id: int) -> dict:
+    """Создаёт превью картинки рецепта и сохраняет их пути в рецепте."""
+    recipe = Recipe.objects.only("id", "image").filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return {}
+    directory = get_renditions_dir(recipe.image.name)
+    renditions = {
+        name: f"{directory}/{name}.{EXTENSIONS[image_format]}"
+        for name, (_, image_format, _) in RENDITIONS.items()
+    }
+    missing = [
+        name
+        for name, path in renditions.items()
+        if not default_storage.exists(path)
+    ]
+    if missing:
+        with recipe.image.open("rb"):
+            image = ImageOps.exif_transpose(Image.open(recipe.image))
+            image.load()
+        for name in missing:
+            size, image_format, crop = RENDITIONS[name]
+            renditions[name] = default_storage.save(
+                renditions[name], render(image, size, image_format, crop)
+            )
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_renditions=renditions, updated=timezone.now())
+    if updated:
+        bump_recipe_version(recipe_id)
+    return renditions
+
+
+def _run_in_background(recipe_id: int) -> None:
+    try:
+        generate_renditions(recipe_id)
+    except Exception:
+        logger.exception("Не удалось создать превью рецепта %s", recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe_id: int) -> None:
+    transaction.on_commit(
+        lambda: executor.submit(_run_in_background, recipe_id)
+    )
@@ -0,0 +1,409 @@
+import csv
+import json
+from collections import Counter
+from functools import partial
+from typing import IO, Iterator
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.cache import bump_recipe_version, bump_table_version
+from recipes.image_fetch import ImageFetchError, get_image_fetcher
+from recipes.images import schedule_renditions
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.recipe_index import (
+    delete_recipe_ingredients, invalidate_recipe_index,
+)
+from recipes.search import update_search_vector
+from recipes.shopping_list import get_wishlist_user_ids, update_shopping_lists
+from recipes.units import get_unit_ids, normalize_unit_name
+from recipes.utils import update_counter
+
+User = get_user_model()
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file: IO, fieldnames: tuple) -> Iterator[dict]:
+    """Строки CSV; файл без заголовка читается по порядку полей."""
+    reader = csv.DictReader(file)
+    if set(fieldnames) - set(reader.fieldnames or ()):
+        file.seek(0)
+        reader = csv.DictReader(file, fieldnames=fieldnames)
+    return reader
+
+
+def read_jsonl(file: IO, fieldnames: tuple) -> Iterator[dict]:
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json(file: IO, fieldnames: tuple) -> Iterator[dict]:
+    """Элементы JSON-массива по одному, без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("JSON file must contain an array")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("Unexpected end of JSON array")
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+READERS = {
+    "csv": read_csv,
+    "json": read_json,
+    "jsonl": read_jsonl,
+}
+
+
+class Importer:
+    """Идемпотентная загрузка пачками: создаёт новое, обновляет
+    изменившееся и не трогает совпадающие строки."""
+
+    fieldnames = ()
+
+    def __init__(self) -> None:
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def clean(self, row: dict) -> tuple:
+        raise NotImplementedError
+
+    def import_batch(self, rows: list) -> None:
+        raise NotImplementedError
+
+    def finish(self) -> None:
+        pass
+
+
+class IngredientImporter(Importer):
+    """Ингредиенты по ключу (name, measurement_unit)."""
+
+    fieldnames = ("name", "measurement_unit")
+
+    def clean(self, row: dict) -> tuple:
+        name = row["name"].strip()
+        unit = normalize_unit_name(row["measurement_unit"])
+        if not name or not unit:
+            raise ValueError("name and measurement_unit are required")
+        return name, unit
+
+    def get_ids(self, keys: set) -> dict:
+        """Ключ -> id; недостающие ингредиенты создаются."""
+        ids = self.find(keys)
+        missing = keys - ids.keys()
+        if missing:
+            unit_ids = get_unit_ids({unit for _, unit in missing})
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit_id=unit_ids[unit])
+                    for name, unit in missing
+                ),
+                ignore_conflicts=True,
+            )
+            self.created += len(missing)
+            ids.update(self.find(missing))
+        return ids
+
+    def find(self, keys: set) -> dict:
+        rows = Ingredient.objects.filter(
+            name__in={name for name, _ in keys}
+        ).values_list("name", "measurement_unit__name", "pk")
+        return {
+            (name, unit): pk for name, unit, pk in rows if (name, unit) in keys
+        }
+
+    def import_batch(self, rows: list) -> None:
+        self.get_ids(set(rows))
+
+    def finish(self) -> None:
+        if self.created:
+            bump_table_version(Ingredient)
+
+
+class TagImporter(Importer):
+    """Теги по slug; name и color обновляются."""
+
+    fieldnames = ("name", "color", "slug")
+
+    def clean(self, row: dict) -> tuple:
+        return row["slug"].strip(), row["name"].strip(), row["color"].strip()
+
+    def import_batch(self, rows: list) -> None:
+        rows = {slug: (name, color) for slug, name, color in rows}
+        existing = Tag.objects.in_bulk(rows, field_name="slug")
+        changed = []
+        for slug, (name, color) in rows.items():
+            tag = existing.get(slug)
+            if tag and (tag.name, tag.color) != (name, color):
+                tag.name, tag.color = name, color
+                changed.append(tag)
+        Tag.objects.bulk_update(changed, ("name", "color"))
+        Tag.objects.bulk_create(
+            Tag(slug=slug, name=name, color=color)
+            for slug, (name, color) in rows.items()
+            if slug not in existing
+        )
+        self.updated += len(changed)
+        self.created += len(rows) - len(existing)
+
+    def finish(self) -> None:
+        if self.created or self.updated:
+            bump_table_version(Tag)
+
+
+class RecipeImporter(Importer):
+    """Рецепты по ключу (автор, название) вместе с тегами и
+    ингредиентами. Автор задаётся username, теги — slug, ингредиенты —
+    name/measurement_unit/amount (отсутствующие создаются). Картинка —
+    URL или имя уже загруженного файла."""
+
+    fieldnames = (
+        "author",
+        "name",
+        "text",
+        "cooking_time",
+        "image",
+        "tags",
+        "ingredients",
+    )
+    fields = ("text", "cooking_time", "image")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.ingredients = IngredientImporter()
+
+    def clean(self, row: dict) -> tuple:
+        cooking_time = int(row["cooking_time"])
+        if cooking_time < 1:
+            raise ValueError("cooking_time must be positive")
+        ingredients = {}
+        for item in row["ingredients"]:
+            amount = int(item["amount"])
+            if amount < 1:
+                raise ValueError("ingredient amount must be positive")
+            ingredients[self.ingredients.clean(item)] = amount
+        return (
+            row["author"],
+            row["name"].strip(),
+            {
+                "text": row["text"],
+                "cooking_time": cooking_time,
+                "image": row.get("image") or "",
+            },
+            frozenset(row.get("tags") or ()),
+            ingredients,
+        )
+
+    def import_batch(self, rows: list) -> None:
+        authors = dict(
+            User.objects.filter(
+                username__in={row[0] for row in rows}
+            ).values_list("username", "pk")
+        )
+        tags = dict(
+            Tag.objects.filter(
+                slug__in=set().union(*(row[3] for row in rows))
+            ).values_list("slug", "pk")
+        )
+        resolved = {}
+        for author, name, values, tag_slugs, ingredients in rows:
+            if author not in authors:
+                self.errors.append(f"{name}: unknown author {author}")
+                continue
+            if tag_slugs - tags.keys():
+                self.errors.append(
+                    f"{name}: unknown tags {sorted(tag_slugs - tags.keys())}"
+                )
+                continue
+            resolved[authors[author], name] = (
+                values,
+                {tags[slug] for slug in tag_slugs},
+                ingredients,
+            )
+        if not resolved:
+            return
+        self.fetch_images(resolved)
+        ingredient_ids = self.ingredients.get_ids(
+            set().union(*(row[2].keys() for row in resolved.values()))
+        )
+        recipes, created, updated = self.upsert_recipes(resolved)
+        relinked = self.sync_tags(recipes, resolved)
+        relinked |= self.sync_ingredients(recipes, resolved, ingredient_ids)
+        relinked -= created | updated
+        if relinked:
+            Recipe.objects.filter(pk__in=relinked).update(
+                updated=timezone.now()
+            )
+        self.created += len(created)
+        self.updated += len(updated | relinked)
+        update_search_vector(created | updated | relinked)
+        if created or updated or relinked:
+            transaction.on_commit(partial(bump_table_version, Recipe))
+        if created or relinked:
+            transaction.on_commit(
+                partial(invalidate_recipe_index, *created, *relinked)
+            )
+        transaction.on_commit(
+            partial(bump_recipe_version, *updated, *relinked)
+        )
+
+    def fetch_images(self, resolved: dict) -> None:
+        urls = {
+            values["image"]
+            for values, _, _ in resolved.values()
+            if values["image"].startswith(("http://", "https://"))
+        }
+        if not urls:
+            return
+        names = get_image_fetcher().fetch_many(urls)
+        for key, (values, _, _) in resolved.items():
+            name = names.get(values["image"])
+            if isinstance(name, ImageFetchError):
+                self.errors.append(f"{key[1]}: {name}")
+                values.pop("image")
+            elif name:
+                values["image"] = name
+
+    def find_recipes(self, keys: set) -> dict:
+        return {
+            (recipe.author_id, recipe.name): recipe
+            for recipe in Recipe.objects.filter(
+                author_id__in={author for author, _ in keys},
+                name__in={name for _, name in keys},
+            ).only("pk", "author_id", "name", *self.fields)
+            if (recipe.author_id, recipe.name) in keys
+        }
+
+    def upsert_recipes(self, resolved: dict) -> tuple:
+        """Создаёт новые и обновляет изменившиеся рецепты.
+
+        Возвращает словарь ключ -> рецепт и множества id созданных и
+        обновлённых рецептов.
+        """
+        recipes = self.find_recipes(resolved.keys())
+        changed = []
+        for key, recipe in recipes.items():
+            values = resolved[key][0]
+            if any(
+                getattr(recipe, field) != value
+                for field, value in values.items()
+            ):
+                for field, value in values.items():
+                    setattr(recipe, field, value)
+                recipe.updated = timezone.now()
+                changed.append(recipe)
+        Recipe.objects.bulk_update(changed, (*self.fields, "updated"))
+        missing = resolved.keys() - recipes.keys()
+        Recipe.objects.bulk_create(
+            Recipe(author_id=author, name=name, **resolved[author, name][0])
+            for author, name in missing
+        )
+        new = self.find_recipes(missing)
+        recipes.update(new)
+        for author, count in Counter(a for a, _ in missing).items():
+            update_counter(User, author, "recipes_count", count)
+        for recipe in (*changed, *new.values()):
+            if recipe.image:
+                schedule_renditions(recipe.pk)
+        return (
+            recipes,
+            {recipe.pk for recipe in new.values()},
+            {recipe.pk for recipe in changed},
+        )
+
+    def sync_tags(self, recipes: dict, resolved: dict) -> set:
+        """Перезаписывает теги только у рецептов, где они отличаются."""
+        through = Recipe.tags.through
+        current = {recipe.pk: set() for recipe in recipes.values()}
+        for recipe_id, tag_id in through.objects.filter(
+            recipe_id__in=current
+        ).values_list("recipe_id", "tag_id"):
+            current[recipe_id].add(tag_id)
+        changed = {
+            recipes[key].pk
+            for key, (_, tag_ids, _) in resolved.items()
+            if current[recipes[key].pk] != tag_ids
+        }
+        through.objects.filter(recipe_id__in=changed).delete()
+        through.objects.bulk_create(
+            through(recipe_id=recipes[key].pk, tag_id=tag_id)
+            for key, (_, tag_ids, _) in resolved.items()
+            if recipes[key].pk in changed
+            for tag_id in tag_ids
+        )
+        return changed
+
+    def sync_ingredients(
+        self, recipes: dict, resolved: dict, ingredient_ids: dict
+    ) -> set:
+        """Перезаписывает состав только у рецептов, где он отличается."""
+        current = {recipe.pk: {} for recipe in recipes.values()}
+        for (
+            recipe_id,
+            ingredient_id,
+            amount,
+        ) in RecipeIngredient.objects.filter(
+            recipe_id__in=current
+        ).values_list(
+            "recipe_id", "ingredient_id", "amount"
+        ):
+            current[recipe_id][ingredient_id] = amount
+        wanted = {
+            recipes[key].pk: {
+                ingredient_ids[ingredient]: amount
+                for ingredient, amount in ingredients.items()
+            }
+            for key, (_, _, ingredients) in resolved.items()
+        }
+        changed = {
+            recipe_id
+            for recipe_id, amounts in wanted.items()
+            if current[recipe_id] != amounts
+        }
+        for recipe_id in changed:
+            update_shopping_lists(
+                get_wishlist_user_ids(recipe_id),
+                {
+                    ingredient_id: wanted[recipe_id].get(ingredient_id, 0)
+                    - current[recipe_id].get(ingredient_id, 0)
+                    for ingredient_id in wanted[recipe_id].keys()
+                    | current[recipe_id].keys()
+                },
+            )
+        delete_recipe_ingredients(
+            RecipeIngredient.objects.filter(recipe_id__in=changed)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe_id in changed
+            for ingredient_id, amount in wanted[recipe_id].items()
+        )
+        return changed
+
+    def finish(self) -> None:
+        self.ingredients.finish()
+
+
+IMPORTERS = {
+    "ingredients": IngredientImporter,
+    "tags": TagImporter,
+    "recipes": RecipeImporter,
+}
@@ -0,0 +1,14 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db.models import Index
+
+
+class PortableGinIndex(GinIndex):
+    """GIN-индекс в PostgreSQL и обычный индекс в других СУБД, чтобы
+    схема создавалась и в тестовой базе SQLite."""
+
+    def create_sql(
+        self, model: type, schema_editor: object, using: str = "", **kwargs
+    ) -> object:
+        if schema_editor.connection.vendor != "postgresql":
+            return Index.create_sql(self, model, schema_editor, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
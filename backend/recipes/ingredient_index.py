@@ -0,0 +1,61 @@
+import threading
+from bisect import bisect_left
+
+from recipes.cache import get_table_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный индекс ингредиентов в памяти процесса.
+
+    Каталог небольшой и почти не меняется, поэтому автодополнение
+    обслуживается без запросов к базе. Индекс перестраивается, когда
+    меняется общая для всех процессов версия таблицы в кэше, — та же,
+    из которой строится ETag списка ингредиентов.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+
+    def _get_snapshot(self) -> tuple:
+        version = get_table_version(Ingredient)
+        if self._version == version:
+            return self._snapshot
+        with self._lock:
+            if self._version != version:
+                ingredients = sorted(
+                    Ingredient.objects.select_related("measurement_unit"),
+                    key=lambda ingredient: (
+                        ingredient.name.casefold(),
+                        ingredient.id,
+                    ),
+                )
+                keys = [
+                    ingredient.name.casefold() for ingredient in ingredients
+                ]
+                self._snapshot = (keys, ingredients)
+                self._version = version
+            return self._snapshot
+
+    def search(self, query: str, limit: int) -> list[Ingredient]:
+        keys, ingredients = self._get_snapshot()
+        query = query.strip().casefold()
+        if not query:
+            return ingredients
+        result = []
+        for position in range(bisect_left(keys, query), len(keys)):
+            if len(result) >= limit or not keys[position].startswith(query):
+                break
+            result.append(ingredients[position])
+        if len(result) < limit:
+            for key, ingredient in zip(keys, ingredients):
+                if query in key and not key.startswith(query):
+                    result.append(ingredient)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,38 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+
+class Command(BaseCommand):
+    help = "Time recipe search queries against the current database"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("queries", nargs="+")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=6)
+        parser.add_argument(
+            "--explain", action="store_true", help="Print EXPLAIN ANALYZE"
+        )
+
+    def handle(self, *args, **options) -> None:
+        self.stdout.write(f"{Recipe.objects.count()} recipes")
+        for query in options["queries"]:
+            recipes = search_recipes(Recipe.objects.only("id", "name"), query)
+            page = recipes[: options["limit"]]
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                names = [recipe.name for recipe in page.all()]
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{query!r}: p50 {statistics.median(timings):.1f} ms, "
+                f"p95 {p95:.1f} ms, top: {names}"
+            )
+            if options["explain"]:
+                self.stdout.write(page.explain(analyze=True))
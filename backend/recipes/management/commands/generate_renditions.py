@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Generate image renditions for recipes that have none"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate renditions for every recipe with an image",
+        )
+
+    def handle(self, *args, **options) -> None:
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(image_renditions={})
+        count = 0
+        for recipe_id in recipes.values_list("id", flat=True).iterator():
+            try:
+                generate_renditions(recipe_id)
+            except OSError as error:
+                self.stderr.write(f"Recipe {recipe_id}: {error}")
+                continue
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Renditions generated: {count}"))
@@ -0,0 +1,84 @@
+import time
+from pathlib import Path
+from typing import Iterator
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.importers import IMPORTERS, READERS, Importer
+from recipes.utils import batched
+
+
+class Command(BaseCommand):
+    help = (
+        "Import ingredients, tags or recipes from CSV/JSON/JSONL. "
+        "Existing rows are matched by natural key and updated, "
+        "so the import is safe to re-run."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--model",
+            choices=IMPORTERS,
+            help="Defaults to the file name, e.g. ingredients.csv",
+        )
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=READERS,
+            help="Defaults to the file extension",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        path = options["path"]
+        model = options["model"] or path.stem
+        file_format = options["file_format"] or path.suffix.lstrip(".")
+        if model not in IMPORTERS:
+            raise CommandError(f"Unknown model {model}, use --model")
+        if file_format not in READERS:
+            raise CommandError(f"Unknown format {file_format}, use --format")
+        if model == "recipes" and file_format == "csv":
+            raise CommandError("Recipes can be imported from JSON/JSONL only")
+        importer = IMPORTERS[model]()
+        started = time.monotonic()
+        total = 0
+        try:
+            with open(path, encoding="utf-8", newline="") as file:
+                rows = READERS[file_format](file, importer.fieldnames)
+                for batch in batched(
+                    self.clean(importer, rows), options["batch_size"]
+                ):
+                    with transaction.atomic():
+                        importer.import_batch(batch)
+                    total += len(batch)
+                    self.report_errors(importer)
+                    self.stdout.write(
+                        f"{total} rows, "
+                        f"{total / (time.monotonic() - started):.0f} rows/s"
+                    )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        finally:
+            importer.finish()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{model}: {total} rows in {elapsed:.1f}s "
+                f"({total / elapsed:.0f} rows/s), "
+                f"{importer.created} created, {importer.updated} updated"
+            )
+        )
+
+    def clean(self, importer: Importer, rows: Iterator) -> Iterator[tuple]:
+        for number, row in enumerate(rows, 1):
+            try:
+                yield importer.clean(row)
+            except (AttributeError, KeyError, TypeError, ValueError) as error:
+                self.stderr.write(f"Row {number} skipped: {error!r}")
+
+    def report_errors(self, importer: Importer) -> None:
+        for error in importer.errors:
+            self.stderr.write(f"Skipped: {error}")
+        importer.errors.clear()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = "Rebuild shopping list items from users' wishlists"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--user", type=int, action="append", dest="user_ids"
+        )
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            total = rebuild_shopping_lists(options["user_ids"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} shopping list items rebuilt")
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, Wishlist
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "wishlist_count", Wishlist, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", Follow, "author"),
+)
+
+
+def count_subquery(related_model: type, field: str) -> Coalesce:
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recount denormalized favorites/wishlist/recipes/followers counters"
+
+    def handle(self, *args, **kwargs) -> None:
+        for model, counter, related_model, field in COUNTERS:
+            actual = count_subquery(related_model, field)
+            with transaction.atomic():
+                stale_ids = (
+                    model.objects.annotate(actual=actual)
+                    .exclude(**{counter: F("actual")})
+                    .values("pk")
+                )
+                fixed = model.objects.filter(pk__in=stale_ids).update(
+                    **{counter: actual}
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model.__name__}.{counter}: {fixed} rows reconciled"
+                )
+            )
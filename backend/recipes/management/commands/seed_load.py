@@ -0,0 +1,335 @@
+import io
+import random
+import time
+from itertools import accumulate
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Model
+
+from recipes.cache import bump_table_version
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, Tag, Wishlist,
+)
+from recipes.recipe_index import invalidate_recipe_index
+from recipes.search import update_search_vector
+from recipes.shopping_list import rebuild_shopping_lists
+from recipes.utils import batched
+from users.models import Follow, User
+
+SCALES = {
+    "small": {"users": 1_000, "recipes": 10_000, "favorites": 100_000},
+    "medium": {"users": 10_000, "recipes": 100_000, "favorites": 1_000_000},
+    "large": {
+        "users": 100_000,
+        "recipes": 1_000_000,
+        "favorites": 10_000_000,
+    },
+}
+TAG_COLORS = ("#E26C2D", "#49B64E", "#8775D2")
+ZIPF_EXPONENT = 1.1
+
+
+def zipf_weights(size: int) -> list:
+    """Накопленные веса закона Ципфа: k-й элемент популярнее
+    (k+1)-го, как авторы, рецепты и ингредиенты в жизни."""
+    return list(
+        accumulate(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(size))
+    )
+
+
+def sample_distinct(
+    rng: random.Random,
+    population: list,
+    cum_weights: list,
+    k: int,
+    exclude: object = None,
+) -> set:
+    """k разных элементов: сначала по весам, остаток равномерно,
+    чтобы не ждать редких элементов из хвоста распределения."""
+    k = min(k, len(population) - (exclude is not None))
+    picks = set(rng.choices(population, cum_weights=cum_weights, k=k))
+    picks.discard(exclude)
+    while len(picks) < k:
+        pick = rng.choice(population)
+        if pick != exclude:
+            picks.add(pick)
+    return picks
+
+
+def per_user(total: int, cum_weights: list, limit: int) -> Iterator[int]:
+    """Распределяет total строк по пользователям пропорционально
+    весам активности. Не поместившееся в limit переходит к следующим
+    пользователям, так что набирается ровно total строк."""
+    previous = carry = 0
+    for weight in cum_weights:
+        current = round(total * weight / cum_weights[-1])
+        count = min(limit, current - previous + carry)
+        carry += current - previous - count
+        previous = current
+        yield count
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate deterministic load-testing data: users, follows, "
+        "recipes with tags and ingredients, favorites and shopping carts. "
+        "Popularity follows a Zipf distribution, the same --seed on the "
+        "same database produces the same rows."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--scale", choices=SCALES, default="small")
+        parser.add_argument("--users", type=int)
+        parser.add_argument("--recipes", type=int)
+        parser.add_argument("--favorites", type=int)
+        parser.add_argument(
+            "--follows", type=int, default=10, help="Per user on average"
+        )
+        parser.add_argument(
+            "--wishlists", type=int, default=3, help="Per user on average"
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--prefix", default="load", help="Username and email prefix"
+        )
+        parser.add_argument(
+            "--password", default="loadtest", help="Password of every user"
+        )
+
+    def handle(self, *args, **options) -> None:
+        scale = {
+            key: options[key] if options[key] is not None else default
+            for key, default in SCALES[options["scale"]].items()
+        }
+        if min(scale.values()) < 1 or scale["users"] < 2:
+            raise CommandError("Need at least 2 users and 1 recipe/favorite")
+        prefix = options["prefix"]
+        if User.objects.filter(username=f"{prefix}0").exists():
+            raise CommandError(
+                f"Users with prefix {prefix} already exist, use --prefix"
+            )
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        started = time.monotonic()
+
+        tag_ids, ingredient_ids = self.ensure_catalog()
+        user_ids = self.create_users(
+            scale["users"], prefix, options["password"]
+        )
+        # Один и тот же вес у пользователя как у автора и как у
+        # читателя: кто больше пишет, тот активнее и популярнее.
+        self.rng.shuffle(user_ids)
+        user_weights = zipf_weights(len(user_ids))
+        self.create_follows(user_ids, user_weights, options["follows"])
+        recipe_ids = self.create_recipes(
+            scale["recipes"], user_ids, user_weights
+        )
+        self.link_recipes(recipe_ids, tag_ids, ingredient_ids)
+        self.rng.shuffle(recipe_ids)
+        recipe_weights = zipf_weights(len(recipe_ids))
+        for model, total in (
+            (Favorite, scale["favorites"]),
+            (Wishlist, options["wishlists"] * len(user_ids)),
+        ):
+            self.create_pairs(
+                model,
+                total,
+                user_ids,
+                user_weights,
+                recipe_ids,
+                recipe_weights,
+            )
+        self.finish(recipe_ids, user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done in {time.monotonic() - started:.1f}s, "
+                f"password of every user: {options['password']}"
+            )
+        )
+
+    def ensure_catalog(self) -> tuple:
+        if not Ingredient.objects.exists():
+            call_command(
+                "import_data",
+                settings.BASE_DIR / "data" / "ingredients.json",
+                stdout=io.StringIO(),
+            )
+        for slug, color in zip(Tag.TagChoice.values, TAG_COLORS):
+            Tag.objects.get_or_create(
+                slug=slug, defaults={"name": slug, "color": color}
+            )
+        tag_ids = list(Tag.objects.order_by("pk").values_list("pk", flat=True))
+        ingredient_ids = list(
+            Ingredient.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        # Популярные ингредиенты (соль, мука) — случайные, но
+        # одни и те же при одинаковом --seed.
+        self.rng.shuffle(ingredient_ids)
+        return tag_ids, ingredient_ids
+
+    def insert(
+        self, model: type, objects: Iterable[Model], total: int = None
+    ) -> int:
+        """Пакетный bulk_create, каждый пакет в своей транзакции."""
+        label = model.__name__
+        started = time.monotonic()
+        created = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+            self.stdout.write(
+                f"{label}: {created}"
+                + (f"/{total}" if total else "")
+                + f", {created / (time.monotonic() - started):.0f} rows/s",
+                ending="\r",
+            )
+        self.stdout.write(
+            f"{label}: {created} rows in {time.monotonic() - started:.1f}s"
+        )
+        return created
+
+    def new_ids(self, model: type, objects: Iterable[Model]) -> list:
+        """Создаёт объекты и возвращает их id по возрастанию: bulk_create
+        не везде возвращает первичные ключи."""
+        last_id = model.objects.aggregate(last_id=Max("pk"))["last_id"] or 0
+        self.insert(model, objects)
+        return list(
+            model.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_users(self, total: int, prefix: str, password: str) -> list:
+        password = make_password(password)
+        return self.new_ids(
+            User,
+            (
+                User(
+                    username=f"{prefix}{i}",
+                    email=f"{prefix}{i}@example.com",
+                    first_name=f"Имя{i}",
+                    last_name=f"Фамилия{i}",
+                    password=password,
+                )
+                for i in range(total)
+            ),
+        )
+
+    def create_follows(
+        self, user_ids: list, user_weights: list, average: int
+    ) -> None:
+        self.insert(
+            Follow,
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, count in zip(
+                    user_ids,
+                    per_user(
+                        average * len(user_ids),
+                        user_weights,
+                        len(user_ids) // 2,
+                    ),
+                )
+                for author_id in sample_distinct(
+                    self.rng, user_ids, user_weights, count, exclude=user_id
+                )
+            ),
+        )
+
+    def create_recipes(
+        self, total: int, user_ids: list, user_weights: list
+    ) -> list:
+        rng = self.rng
+        return self.new_ids(
+            Recipe,
+            (
+                Recipe(
+                    author_id=author_id,
+                    name=f"Рецепт {i}",
+                    text=f"Описание рецепта {i}. " * rng.randint(1, 20),
+                    cooking_time=rng.randint(1, 180),
+                )
+                for i, author_id in enumerate(
+                    rng.choices(user_ids, cum_weights=user_weights, k=total)
+                )
+            ),
+        )
+
+    def link_recipes(
+        self, recipe_ids: list, tag_ids: list, ingredient_ids: list
+    ) -> None:
+        rng = self.rng
+        self.insert(
+            Recipe.tags.through,
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+            ),
+        )
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        self.insert(
+            RecipeIngredient,
+            (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in sample_distinct(
+                    rng,
+                    ingredient_ids,
+                    ingredient_weights,
+                    rng.randint(3, 12),
+                )
+            ),
+        )
+
+    def create_pairs(
+        self,
+        model: type,
+        total: int,
+        user_ids: list,
+        user_weights: list,
+        recipe_ids: list,
+        recipe_weights: list,
+    ) -> None:
+        """Избранное или список покупок: активные пользователи отмечают
+        больше рецептов, популярные рецепты отмечают чаще."""
+        self.insert(
+            model,
+            (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id, count in zip(
+                    user_ids,
+                    per_user(total, user_weights, len(recipe_ids) // 2 + 1),
+                )
+                for recipe_id in sample_distinct(
+                    self.rng, recipe_ids, recipe_weights, count
+                )
+            ),
+            total,
+        )
+
+    def finish(self, recipe_ids: list, user_ids: list) -> None:
+        """Счётчики, поиск, списки покупок и кэши: bulk_create обходит
+        сигналы."""
+        call_command("recount_counters", stdout=self.stdout)
+        for batch in batched(recipe_ids, self.batch_size):
+            with transaction.atomic():
+                update_search_vector(batch)
+        for batch in batched(user_ids, self.batch_size):
+            with transaction.atomic():
+                rebuild_shopping_lists(batch)
+        self.stdout.write("Shopping lists rebuilt")
+        for model in (Tag, User, Recipe):
+            bump_table_version(model)
+        invalidate_recipe_index()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import RENDITIONS_DIR
+from recipes.models import Recipe
+from recipes.utils import batched
+
+
+class Command(BaseCommand):
+    help = "Delete recipe images and renditions no recipe refers to"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep files touched more recently than this",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        self.dry_run = options["dry_run"]
+        self.batch_size = options["batch_size"]
+        self.cutoff = time.time() - options["grace_hours"] * 3600
+        self.storage = Recipe._meta.get_field("image").storage
+        self.deleted = 0
+        self.freed = 0
+        upload_to = Recipe._meta.get_field("image").upload_to.strip("/")
+        self.sweep(upload_to, lambda entry: entry.is_file())
+        self.sweep(RENDITIONS_DIR, lambda entry: entry.is_dir(), "recipes")
+        action = "Would delete" if self.dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {self.deleted} entries, {self.freed} bytes"
+            )
+        )
+
+    def sweep(
+        self, directory: str, accept: callable, source_dir: str = None
+    ) -> None:
+        """Обходит каталог потоком и проверяет ссылки пачками.
+
+        Для файлов картинок ссылкой считается Recipe.image, для
+        каталогов превью — Recipe.image исходного файла.
+        """
+        path = self.storage.path(directory)
+        if not os.path.isdir(path):
+            return
+        source_dir = source_dir or directory
+        with os.scandir(path) as scanner:
+            entries = (
+                entry
+                for entry in scanner
+                if accept(entry) and entry.stat().st_mtime < self.cutoff
+            )
+            for batch in batched(entries, self.batch_size):
+                names = {
+                    f"{source_dir}/{entry.name}": entry for entry in batch
+                }
+                referenced = set(
+                    Recipe.objects.filter(image__in=names).values_list(
+                        "image", flat=True
+                    )
+                )
+                for name, entry in names.items():
+                    if name not in referenced:
+                        self.remove(entry)
+
+    def remove(self, entry: os.DirEntry) -> None:
+        if entry.is_dir():
+            size = sum(
+                item.stat().st_size
+                for item in os.scandir(entry.path)
+                if item.is_file()
+            )
+        else:
+            size = entry.stat().st_size
+        self.deleted += 1
+        self.freed += size
+        if self.dry_run:
+            self.stdout.write(f"Orphan: {entry.path}")
+            return
+        if entry.is_dir():
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
@@ -0,0 +1,59 @@
+# Generated by Django 3.2 on 2026-10-18 02:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Favorite = apps.get_model("recipes", "Favorite")
+    Wishlist = apps.get_model("recipes", "Wishlist")
+    User = apps.get_model("users", "User")
+    Recipe.objects.update(
+        favorites_count=count_subquery(Favorite, "recipe"),
+        wishlist_count=count_subquery(Wishlist, "recipe"),
+    )
+    User.objects.update(recipes_count=count_subquery(Recipe, "author"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0002_auto_20230822_2351"),
+        ("users", "0003_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Добавлений в избранное",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="wishlist_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Добавлений в список покупок",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
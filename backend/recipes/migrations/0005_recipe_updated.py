@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 02:29
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.update(updated=F("created"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0004_recipe_ordering_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 02:35
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0006_recipe_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                storage=recipes.storage.ContentAddressedStorage(),
+                upload_to="recipes/",
+                verbose_name="Картинка",
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Оставляет ингредиент с наименьшим id, переносит на него
+    количества из рецептов и удаляет дубликаты."""
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    duplicates = (
+        Ingredient.objects.values("name", "measurement_unit")
+        .annotate(keep_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    for group in duplicates.iterator():
+        duplicate_ids = list(
+            Ingredient.objects.filter(
+                name=group["name"], measurement_unit=group["measurement_unit"]
+            )
+            .exclude(id=group["keep_id"])
+            .values_list("id", flat=True)
+        )
+        for row in RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=group["keep_id"]
+            ).first()
+            if kept:
+                kept.amount += row.amount
+                kept.save(update_fields=["amount"])
+                row.delete()
+            else:
+                row.ingredient_id = group["keep_id"]
+                row.save(update_fields=["ingredient"])
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0007_content_addressed_image"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
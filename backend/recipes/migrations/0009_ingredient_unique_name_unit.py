@@ -0,0 +1,48 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+TRIGRAM_INDEX = "ingredient_name_upper_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    """Индекс под icontains/istartswith, которые Django строит как
+    UPPER(name) LIKE UPPER(...). Выражение с opclass в Meta.indexes
+    Django 3.2 не поддерживает, поэтому индекс создаётся SQL-ом."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON recipes_ingredient "
+        "USING gin (UPPER(name) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0008_merge_duplicate_ingredients"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_name_unit",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(
+                fields=("name",),
+                name="ingredient_name_pattern_idx",
+                opclasses=("varchar_pattern_ops",),
+            ),
+        ),
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
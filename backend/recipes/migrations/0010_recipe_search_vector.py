@@ -0,0 +1,64 @@
+# Generated by Django 3.2 on 2026-10-18 02:41
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+import recipes.indexes
+
+
+def fill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(names=StringAgg("ingredient__name", " "))
+        .values("names")
+    )
+    config = settings.RECIPE_SEARCH_CONFIG
+    Recipe.objects.update(
+        search_vector=SearchVector("name", weight="A", config=config)
+        + SearchVector("text", weight="B", config=config)
+        + SearchVector(
+            Coalesce(ingredient_names, Value("")), weight="C", config=config
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0009_ingredient_unique_name_unit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=recipes.indexes.PortableGinIndex(
+                fields=["search_vector"], name="recipe_search_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=recipes.indexes.PortableGinIndex(
+                fields=["name"],
+                name="recipe_name_trgm_idx",
+                opclasses=("gin_trgm_ops",),
+            ),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0011_shopping_list_item"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MeasurementUnit",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100, unique=True, verbose_name="Название"
+                    ),
+                ),
+                (
+                    "factor",
+                    models.PositiveIntegerField(
+                        default=1,
+                        validators=[
+                            django.core.validators.MinValueValidator(1)
+                        ],
+                        verbose_name="Множитель к базовой единице",
+                    ),
+                ),
+                (
+                    "base",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="derived",
+                        to="recipes.measurementunit",
+                        verbose_name="Базовая единица",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Единица измерения",
+                "verbose_name_plural": "Единицы измерения",
+                "ordering": ("name",),
+            },
+        ),
+        migrations.AddField(
+            model_name="ingredient",
+            name="unit",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="ingredients",
+                to="recipes.measurementunit",
+                verbose_name="Единица измерения",
+            ),
+        ),
+    ]
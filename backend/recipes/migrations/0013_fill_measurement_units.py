@@ -0,0 +1,99 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+UNIT_ALIASES = {
+    "г.": "г",
+    "гр": "г",
+    "гр.": "г",
+    "грамм": "г",
+    "кг.": "кг",
+    "мл.": "мл",
+    "л.": "л",
+    "шт": "шт.",
+    "ст.л.": "ст. л.",
+    "ст л": "ст. л.",
+    "ч.л.": "ч. л.",
+    "ч л": "ч. л.",
+}
+BASE_UNITS = {
+    "кг": ("г", 1000),
+    "л": ("мл", 1000),
+}
+
+
+def normalize_unit_name(name):
+    name = " ".join(name.split()).lower()
+    return UNIT_ALIASES.get(name, name)
+
+
+def merge_ingredients(apps, keep_id, duplicate_ids):
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    ShoppingListItem = apps.get_model("recipes", "ShoppingListItem")
+    for model, owner in (
+        (RecipeIngredient, "recipe_id"),
+        (ShoppingListItem, "user_id"),
+    ):
+        amount = "amount" if model is RecipeIngredient else "total_amount"
+        for row in model.objects.filter(ingredient_id__in=duplicate_ids):
+            kept = model.objects.filter(
+                **{owner: getattr(row, owner)}, ingredient_id=keep_id
+            ).first()
+            if kept:
+                setattr(
+                    kept, amount, getattr(kept, amount) + getattr(row, amount)
+                )
+                kept.save(update_fields=[amount])
+                row.delete()
+            else:
+                row.ingredient_id = keep_id
+                row.save(update_fields=["ingredient"])
+
+
+def fill_measurement_units(apps, schema_editor):
+    """Переносит текстовые единицы в MeasurementUnit и сливает
+    ингредиенты, совпавшие после нормализации написания."""
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    MeasurementUnit = apps.get_model("recipes", "MeasurementUnit")
+    raw_names = set(
+        Ingredient.objects.values_list("measurement_unit", flat=True)
+    )
+    names = {normalize_unit_name(name) for name in raw_names}
+    names |= {BASE_UNITS[name][0] for name in names & BASE_UNITS.keys()}
+    units = {}
+    for name in sorted(names, key=lambda name: name in BASE_UNITS):
+        base, factor = BASE_UNITS.get(name, (None, 1))
+        units[name] = MeasurementUnit.objects.create(
+            name=name, base_id=units.get(base), factor=factor
+        ).pk
+    for raw_name in raw_names:
+        Ingredient.objects.filter(measurement_unit=raw_name).update(
+            unit_id=units[normalize_unit_name(raw_name)]
+        )
+    duplicates = (
+        Ingredient.objects.values("name", "unit_id")
+        .annotate(keep_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    for group in duplicates.iterator():
+        duplicate_ids = list(
+            Ingredient.objects.filter(
+                name=group["name"], unit_id=group["unit_id"]
+            )
+            .exclude(id=group["keep_id"])
+            .values_list("id", flat=True)
+        )
+        merge_ingredients(apps, group["keep_id"], duplicate_ids)
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0012_measurement_unit"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_measurement_units, migrations.RunPython.noop
+        ),
+    ]
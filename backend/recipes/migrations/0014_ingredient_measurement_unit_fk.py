@@ -0,0 +1,61 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def restore_measurement_units(apps, schema_editor):
+    """Обратный путь: текстовая колонка возвращается с пустым
+    значением по умолчанию и заполняется названиями единиц до того,
+    как снова станет обязательной и войдёт в ограничение."""
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    MeasurementUnit = apps.get_model("recipes", "MeasurementUnit")
+    for unit in MeasurementUnit.objects.all():
+        Ingredient.objects.filter(unit=unit).update(measurement_unit=unit.name)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0013_fill_measurement_units"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="ingredient",
+            name="unique_ingredient_name_unit",
+        ),
+        migrations.AlterField(
+            model_name="ingredient",
+            name="measurement_unit",
+            field=models.CharField(
+                default="", max_length=100, verbose_name="Единица измерения"
+            ),
+        ),
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_measurement_units
+        ),
+        migrations.RemoveField(
+            model_name="ingredient",
+            name="measurement_unit",
+        ),
+        migrations.RenameField(
+            model_name="ingredient",
+            old_name="unit",
+            new_name="measurement_unit",
+        ),
+        migrations.AlterField(
+            model_name="ingredient",
+            name="measurement_unit",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="ingredients",
+                to="recipes.measurementunit",
+                verbose_name="Единица измерения",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_name_unit",
+            ),
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from recipes.indexes import PortableGinIndex
+from recipes.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -29,12 +33,58 @@ class Tag(models.Model):
         return self.name
 
 
+class MeasurementUnit(models.Model):
+    """Единица измерения; производные единицы приводятся к базовой
+    умножением на factor (кг -> 1000 г)."""
+
+    name = models.CharField("Название", max_length=100, unique=True)
+    base = models.ForeignKey(
+        "self",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="derived",
+        verbose_name="Базовая единица",
+    )
+    factor = models.PositiveIntegerField(
+        "Множитель к базовой единице",
+        default=1,
+        validators=[MinValueValidator(1)],
+    )
+
+    class Meta:
+        ordering = ("name",)
+        verbose_name = "Единица измерения"
+        verbose_name_plural = "Единицы измерения"
+
+    def __str__(self) -> str:
+        return self.name
+
+
 class Ingredient(models.Model):
     name = models.CharField("Название ингредиента", max_length=100)
-    measurement_unit = models.CharField("Единица измерения", max_length=100)
+    measurement_unit = models.ForeignKey(
+        MeasurementUnit,
+        on_delete=models.PROTECT,
+        related_name="ingredients",
+        verbose_name="Единица измерения",
+    )
 
     class Meta:
         ordering = ("name",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_name_unit",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("name",),
+                name="ingredient_name_pattern_idx",
+                opclasses=("varchar_pattern_ops",),
+            ),
+        )
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
 
@@ -59,10 +109,51 @@ class Recipe(models.Model):
     )
     tags = models.ManyToManyField(Tag, blank=False, related_name="recipes")
     created = models.DateTimeField("Дата публикации", auto_now_add=True)
-    image = models.ImageField("Картинка", upload_to="recipes/", blank=True)
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+    image = models.ImageField(
+        "Картинка",
+        upload_to="recipes/",
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True,
+    )
+    image_renditions = models.JSONField(
+        "Превью картинки", default=dict, blank=True, editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        "Добавлений в избранное", default=0, editable=False
+    )
+    wishlist_count = models.PositiveIntegerField(
+        "Добавлений в список покупок", default=0, editable=False
+    )
+    search_vector = SearchVectorField(
+        "Поисковый вектор", null=True, editable=False
+    )
 
     class Meta:
-        ordering = ("-created",)
+        ordering = ("-created", "-id")
+        indexes = (
+            models.Index(
+                fields=("author", "-created"), name="recipe_author_created_idx"
+            ),
+            models.Index(
+                fields=("-created", "-id"), name="recipe_created_id_idx"
+            ),
+            models.Index(
+                fields=("-favorites_count", "-id"), name="recipe_favorites_idx"
+            ),
+            models.Index(
+                fields=("cooking_time", "id"), name="recipe_cooking_time_idx"
+            ),
+            PortableGinIndex(
+                fields=("search_vector",), name="recipe_search_idx"
+            ),
+            PortableGinIndex(
+                fields=("name",),
+                name="recipe_name_trgm_idx",
+                opclasses=("gin_trgm_ops",),
+            ),
+        )
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -102,6 +193,11 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = ["user", "recipe"]
+        indexes = (
+            models.Index(
+                fields=("recipe", "user"), name="favorite_recipe_user_idx"
+            ),
+        )
         verbose_name = "Избранное"
         verbose_name_plural = "Избранные"
 
@@ -121,8 +217,40 @@ class Wishlist(models.Model):
 
     class Meta:
         unique_together = ["user", "recipe"]
+        indexes = (
+            models.Index(
+                fields=("recipe", "user"), name="wishlist_recipe_user_idx"
+            ),
+        )
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
 
     def __str__(self):
         return self.recipe.name
+
+
+class ShoppingListItem(models.Model):
+    """Строка списка покупок: сумма ингредиента по рецептам из списка."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="shopping_list"
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_list_items",
+    )
+    total_amount = models.PositiveIntegerField("Количество", default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_list_item",
+            ),
+        )
+        verbose_name = "Позиция списка покупок"
+        verbose_name_plural = "Позиции списка покупок"
+
+    def __str__(self) -> str:
+        return f"{self.ingredient} {self.total_amount}"
@@ -0,0 +1,178 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from recipes.cache import bump_table_version, get_table_version
+from recipes.models import RecipeIngredient
+
+CHANGE_SEQUENCE_KEY = "recipe-index:sequence"
+CHANGE_KEY = "recipe-index:change:{}"
+MAX_PENDING_CHANGES = 1000
+
+
+class RankedMatches:
+    """Рецепты, отсортированные по доле имеющихся ингредиентов.
+
+    Последовательность для пагинатора: срез сортирует только те
+    элементы, которые нужны до конца запрошенной страницы.
+    """
+
+    def __init__(self, matched: Counter, totals: dict) -> None:
+        self.matched = matched
+        self.totals = totals
+
+    def __len__(self) -> int:
+        return len(self.matched)
+
+    def _rank(self, recipe_id: int) -> tuple:
+        matched, total = self.matched[recipe_id], self.totals[recipe_id]
+        return (-matched / total, total - matched, -recipe_id)
+
+    def __getitem__(self, page: slice) -> list:
+        start = page.start or 0
+        top = heapq.nsmallest(page.stop, self.matched, key=self._rank)
+        return [
+            (recipe_id, self.matched[recipe_id], self.totals[recipe_id])
+            for recipe_id in top[start:]
+        ]
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс ингредиент -> отсортированный массив id рецептов.
+
+    Подбор рецептов по имеющимся ингредиентам сводится к подсчёту
+    вхождений id в нескольких массивах, без GROUP BY по всей таблице.
+    Индекс строится одним запросом, когда меняется общая для всех
+    процессов версия таблицы в кэше. Правки отдельных рецептов
+    публикуются в кэше по номерам и применяются к снимку точечно.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._sequence = None
+
+    def _get_snapshot(self) -> tuple:
+        version = get_table_version(RecipeIngredient)
+        sequence = cache.get(CHANGE_SEQUENCE_KEY, 0)
+        if self._version == version and self._sequence == sequence:
+            return self._snapshot
+        with self._lock:
+            if (
+                self._version != version
+                or self._sequence is None
+                or not self._apply_changes(sequence)
+            ):
+                self._rebuild(version, sequence)
+            return self._snapshot
+
+    def _rebuild(self, version: str, sequence: int) -> None:
+        postings, totals = {}, Counter()
+        rows = (
+            RecipeIngredient.objects.order_by("ingredient_id", "recipe_id")
+            .values_list("ingredient_id", "recipe_id")
+            .iterator()
+        )
+        for ingredient_id, recipe_id in rows:
+            if ingredient_id not in postings:
+                postings[ingredient_id] = array("I")
+            postings[ingredient_id].append(recipe_id)
+            totals[recipe_id] += 1
+        self._snapshot = (postings, dict(totals))
+        self._version = version
+        self._sequence = sequence
+
+    def _apply_changes(self, sequence: int) -> bool:
+        """Перечитывает изменённые рецепты; False, если журнал правок
+        неполон и индекс нужно построить заново."""
+        if sequence == self._sequence:
+            return True
+        if not 0 < sequence - self._sequence <= MAX_PENDING_CHANGES:
+            return False
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(self._sequence + 1, sequence + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        recipe_ids = set().union(*changes.values())
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list("ingredient_id", "recipe_id")
+        # Копия при записи: match в других потоках читает старый снимок.
+        postings, totals = self._snapshot
+        postings, totals = dict(postings), dict(totals)
+        copied = set()
+        for ingredient_id, posting in postings.items():
+            if any(_contains(posting, pk) for pk in recipe_ids):
+                postings[ingredient_id] = array(
+                    "I", (pk for pk in posting if pk not in recipe_ids)
+                )
+                copied.add(ingredient_id)
+        for recipe_id in recipe_ids:
+            totals.pop(recipe_id, None)
+        for ingredient_id, recipe_id in rows:
+            if ingredient_id not in copied:
+                postings[ingredient_id] = array(
+                    "I", postings.get(ingredient_id, ())
+                )
+                copied.add(ingredient_id)
+            insort(postings[ingredient_id], recipe_id)
+            totals[recipe_id] = totals.get(recipe_id, 0) + 1
+        self._snapshot = (postings, totals)
+        self._sequence = sequence
+        return True
+
+    def match(
+        self, ingredient_ids: set, max_missing: int = None
+    ) -> RankedMatches:
+        postings, totals = self._get_snapshot()
+        matched = Counter()
+        for ingredient_id in ingredient_ids:
+            matched.update(postings.get(ingredient_id, ()))
+        if max_missing is not None:
+            matched = Counter(
+                {
+                    recipe_id: count
+                    for recipe_id, count in matched.items()
+                    if totals[recipe_id] - count <= max_missing
+                }
+            )
+        return RankedMatches(matched, totals)
+
+
+def _contains(posting: array, recipe_id: int) -> bool:
+    position = bisect_left(posting, recipe_id)
+    return position < len(posting) and posting[position] == recipe_id
+
+
+def invalidate_recipe_index(*recipe_ids: int) -> None:
+    """Публикует правку рецептов для всех процессов; без id или при
+    массовой правке индекс строится заново."""
+    if not recipe_ids or len(recipe_ids) > MAX_PENDING_CHANGES:
+        bump_table_version(RecipeIngredient)
+        return
+    cache.add(CHANGE_SEQUENCE_KEY, 0, timeout=None)
+    sequence = cache.incr(CHANGE_SEQUENCE_KEY)
+    cache.set(
+        CHANGE_KEY.format(sequence),
+        set(recipe_ids),
+        timeout=settings.RECIPE_CACHE_TIMEOUT,
+    )
+
+
+def delete_recipe_ingredients(queryset: QuerySet) -> int:
+    """Удаляет строки состава одним DELETE, без post_delete на каждую
+    строку; правку рецептов публикует вызывающий, по разу на рецепт."""
+    return queryset._raw_delete(queryset.db)
+
+
+recipe_index = RecipeIngredientIndex()
@@ -0,0 +1,67 @@
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe, RecipeIngredient
+
+
+def is_supported() -> bool:
+    """Полнотекстовый поиск есть только в PostgreSQL."""
+    return connection.vendor == "postgresql"
+
+
+def build_search_vector() -> SearchVector:
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(names=StringAgg("ingredient__name", " "))
+        .values("names")
+    )
+    config = settings.RECIPE_SEARCH_CONFIG
+    return (
+        SearchVector("name", weight="A", config=config)
+        + SearchVector("text", weight="B", config=config)
+        + SearchVector(
+            Coalesce(ingredient_names, Value("")), weight="C", config=config
+        )
+    )
+
+
+def update_search_vector(recipe_ids: Iterable) -> None:
+    """Пересчитывает поисковый вектор; recipe_ids — id или queryset."""
+    if not is_supported():
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=build_search_vector()
+    )
+
+
+def search_recipes(queryset: QuerySet, text: str) -> QuerySet:
+    """Рецепты по словам из названия, описания и ингредиентов.
+
+    Опечатки в названии ловит триграммное сходство; результат
+    отсортирован по релевантности.
+    """
+    if not is_supported():
+        return queryset.filter(
+            Q(name__icontains=text) | Q(text__icontains=text)
+        )
+    query = SearchQuery(
+        text, config=settings.RECIPE_SEARCH_CONFIG, search_type="websearch"
+    )
+    return (
+        queryset.filter(Q(search_vector=query) | Q(name__trigram_similar=text))
+        .annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+            + TrigramSimilarity("name", text)
+        )
+        .order_by("-search_rank", "-id")
+    )
@@ -0,0 +1,146 @@
+from typing import Iterable
+
+from django.db.models import Case, F, QuerySet, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Recipe, RecipeIngredient, ShoppingListItem, Wishlist
+
+
+def lock_recipe(recipe_id: int) -> None:
+    """Блокирует строку рецепта до конца транзакции: правка состава,
+    добавление в корзину и удаление рецепта считают дельты по очереди."""
+    list(
+        Recipe.objects.select_for_update()
+        .filter(pk=recipe_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def get_recipe_amounts(recipe_id: int) -> dict:
+    return dict(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+            "ingredient_id", "amount"
+        )
+    )
+
+
+def get_wishlist_user_ids(recipe_id: int) -> list:
+    return list(
+        Wishlist.objects.filter(recipe_id=recipe_id).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+def update_shopping_lists(user_ids: Iterable, deltas: dict) -> None:
+    """Прибавляет deltas (ингредиент -> количество) к спискам покупок.
+
+    Недостающие позиции сначала создаются с нулём, затем все дельты
+    прибавляются одним UPDATE: блокировки строк упорядочивают
+    параллельные прибавления к одной позиции. Обнулившиеся удаляются.
+    """
+    user_ids = list(user_ids)
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not user_ids or not deltas:
+        return
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    added = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta > 0
+    ]
+    if added:
+        existing = set(
+            items.filter(ingredient_id__in=added).values_list(
+                "user_id", "ingredient_id"
+            )
+        )
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0,
+                )
+                for user_id in user_ids
+                for ingredient_id in added
+                if (user_id, ingredient_id) not in existing
+            ),
+            ignore_conflicts=True,
+        )
+    items.update(
+        total_amount=Greatest(
+            F("total_amount")
+            + Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=Value(delta))
+                    for ingredient_id, delta in deltas.items()
+                ),
+                default=Value(0),
+            ),
+            0,
+        )
+    )
+    items.filter(total_amount=0).delete()
+
+
+def add_recipe(user_id: int, recipe_id: int, sign: int = 1) -> None:
+    update_shopping_lists(
+        [user_id],
+        {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in get_recipe_amounts(recipe_id).items()
+        },
+    )
+
+
+def get_shopping_list(user_id: int) -> QuerySet:
+    """Список покупок пользователя: один GROUP BY по названию и базовой
+    единице, количества переведены в базовую единицу."""
+    unit = "ingredient__measurement_unit"
+    return (
+        ShoppingListItem.objects.filter(user_id=user_id)
+        .values(
+            name=F("ingredient__name"),
+            measurement_unit=Coalesce(
+                F(f"{unit}__base__name"), F(f"{unit}__name")
+            ),
+        )
+        .annotate(total_amount=Sum(F("total_amount") * F(f"{unit}__factor")))
+        .order_by("name", "measurement_unit")
+    )
+
+
+def rebuild_shopping_lists(user_ids: Iterable = None) -> int:
+    """Пересобирает списки покупок из Wishlist; возвращает число строк."""
+    items = ShoppingListItem.objects.all()
+    wishlisted = {"recipe__wishlist_recipe__isnull": False}
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        wishlisted = {"recipe__wishlist_recipe__user_id__in": user_ids}
+    ingredients = RecipeIngredient.objects.filter(**wishlisted)
+    items.delete()
+    totals = (
+        ingredients.values_list(
+            "recipe__wishlist_recipe__user_id", "ingredient_id"
+        )
+        .annotate(total_amount=Sum("amount"))
+        .order_by()
+    )
+    return len(
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount,
+                )
+                for user_id, ingredient_id, total_amount in totals.iterator()
+            ),
+            batch_size=1000,
+        )
+    )
@@ -0,0 +1,93 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.cache import (
+    bump_author_version, bump_recipe_version, bump_table_version,
+)
+from recipes.models import (
+    Ingredient, MeasurementUnit, Recipe, RecipeIngredient, Tag,
+)
+from recipes.recipe_index import invalidate_recipe_index
+from recipes.search import update_search_vector
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def bump_catalog_version(sender: type, **kwargs) -> None:
+    """Версия меняется после коммита: иначе другой процесс успеет
+    прочитать старые строки и сохранить их под новой версией."""
+    transaction.on_commit(partial(bump_table_version, sender))
+
+
+@receiver((post_save, post_delete), sender=MeasurementUnit)
+def bump_unit_version(**kwargs) -> None:
+    transaction.on_commit(partial(bump_table_version, Ingredient))
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_user_version(sender: type, instance: User, **kwargs) -> None:
+    """У нового пользователя нет рецептов, а правка профиля меняет
+    только рецепты этого автора и общие списки."""
+    if kwargs.get("created") or kwargs.get("update_fields") == frozenset(
+        {"last_login"}
+    ):
+        return
+    transaction.on_commit(partial(bump_author_version, instance.id))
+    transaction.on_commit(partial(bump_table_version, sender))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe(instance: Recipe, **kwargs) -> None:
+    transaction.on_commit(partial(bump_recipe_version, instance.id))
+    transaction.on_commit(partial(bump_table_version, Recipe))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_ingredients(
+    instance: RecipeIngredient, **kwargs
+) -> None:
+    transaction.on_commit(partial(bump_recipe_version, instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(
+    instance: Recipe or Tag, action: str, reverse: bool, pk_set: set, **kwargs
+) -> None:
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        transaction.on_commit(partial(bump_recipe_version, instance.id))
+    elif pk_set:
+        transaction.on_commit(partial(bump_recipe_version, *pk_set))
+    else:
+        transaction.on_commit(partial(bump_table_version, Tag))
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance: Recipe, created: bool, **kwargs) -> None:
+    """Состав рецепта пересчитывается там, где он меняется, по разу
+    на рецепт; новый рецепт индексируется после записи ингредиентов."""
+    if not created:
+        update_search_vector([instance.id])
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_recipes(instance: Ingredient, **kwargs) -> None:
+    update_search_vector(
+        RecipeIngredient.objects.filter(ingredient=instance).values(
+            "recipe_id"
+        )
+    )
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_ingredients_index(
+    instance: RecipeIngredient, **kwargs
+) -> None:
+    transaction.on_commit(partial(invalidate_recipe_index, instance.recipe_id))
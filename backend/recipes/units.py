@@ -0,0 +1,48 @@
+from recipes.models import MeasurementUnit
+
+UNIT_ALIASES = {
+    "г.": "г",
+    "гр": "г",
+    "гр.": "г",
+    "грамм": "г",
+    "кг.": "кг",
+    "мл.": "мл",
+    "л.": "л",
+    "шт": "шт.",
+    "ст.л.": "ст. л.",
+    "ст л": "ст. л.",
+    "ч.л.": "ч. л.",
+    "ч л": "ч. л.",
+}
+BASE_UNITS = {
+    "кг": ("г", 1000),
+    "л": ("мл", 1000),
+}
+
+
+def normalize_unit_name(name: str) -> str:
+    name = " ".join(name.split()).lower()
+    return UNIT_ALIASES.get(name, name)
+
+
+def get_unit_ids(names: set) -> dict:
+    """Название единицы -> id; недостающие единицы создаются вместе
+    с базовыми."""
+    names = {normalize_unit_name(name) for name in names}
+    wanted = names | {
+        BASE_UNITS[name][0] for name in names & BASE_UNITS.keys()
+    }
+    ids = dict(
+        MeasurementUnit.objects.filter(name__in=wanted).values_list(
+            "name", "pk"
+        )
+    )
+    for name in sorted(
+        wanted - ids.keys(), key=lambda name: name in BASE_UNITS
+    ):
+        base, factor = BASE_UNITS.get(name, (None, 1))
+        ids[name] = MeasurementUnit.objects.get_or_create(
+            name=name,
+            defaults={"base_id": ids.get(base), "factor": factor},
+        )[0].pk
+    return ids
@@ -1,52 +1,85 @@
-import base64
-from http import HTTPStatus
-from io import BytesIO
-from urllib.parse import urlparse, urlsplit
-
-import pyperclip
-import requests
-
-from recipes.models import Ingredient
-
-
-def url_to_base64(url: str) -> str or None:
-    response = requests.get(url)
-    if response.status_code == HTTPStatus.OK:
-        content_type = response.headers.get("content-type")
-        if not content_type:
-            path = urlparse(url).path
-            ext = urlsplit(path)[1][1:]
-        else:
-            ext = content_type.split("/")[-1]
-        encoded_data = base64.b64encode(response.content)
-        base64_string = f"data:image/{ext};base64," + encoded_data.decode(
-            "utf-8"
-        )
+import csv
+import json
+from typing import Iterable, Iterator
 
-        pyperclip.copy(base64_string)
-        return base64_string
-    return None
+from django.db.models import F, Model
+from django.db.models.functions import Greatest
 
 
-def generate_shopping_cart(ingredients: Ingredient) -> BytesIO:
-    ingredients_str = (
-        "Данный список покупок составлен в сервисе "
-        "Foodgram\n\n"
-        "Список покупок:"
+def update_counter(model: Model, pk: int, field: str, delta: int) -> None:
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
     )
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Строк списка покупок в памяти за раз: от размера корзины память
+# при выгрузке не зависит.
+SHOPPING_CART_CHUNK_SIZE = 200
+SHOPPING_CART_TITLE = (
+    "Данный список покупок составлен в сервисе Foodgram\n\nСписок покупок:"
+)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def generate_shopping_cart_txt(ingredients: Iterable[dict]) -> Iterator[str]:
+    yield SHOPPING_CART_TITLE
+    for ingredient in ingredients:
+        yield (
+            f"\n{ingredient['name']} - {ingredient['total_amount']} "
+            f"{ingredient['measurement_unit']}"
+        )
+
+
+def generate_shopping_cart_csv(ingredients: Iterable[dict]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(["name", "total_amount", "measurement_unit"])
     for ingredient in ingredients:
-        ingredient_name = ingredient[
-            "recipe__recipes_ingredient__ingredient__name"
-        ]
-        total_amount = ingredient["total_amount"]
-        measurement_unit = ingredient[
-            "recipe__recipes_ingredient__ingredient__measurement_unit"
-        ]
-        ingredients_list = [
-            f"{ingredient_name} - {total_amount} {measurement_unit}"
-        ]
-        ingredients_str += "\n" + "\n".join(ingredients_list)
-    buffer = BytesIO()
-    buffer.write(ingredients_str.encode())
-    buffer.seek(0)
-    return buffer
+        yield writer.writerow(
+            [
+                ingredient["name"],
+                ingredient["total_amount"],
+                ingredient["measurement_unit"],
+            ]
+        )
+
+
+def generate_shopping_cart_json(
+    ingredients: Iterable[dict],
+) -> Iterator[str]:
+    yield "["
+    separator = ""
+    for ingredient in ingredients:
+        yield separator + json.dumps(ingredient, ensure_ascii=False)
+        separator = ","
+    yield "]"
+
+
+SHOPPING_CART_FORMATS = {
+    "txt": generate_shopping_cart_txt,
+    "csv": generate_shopping_cart_csv,
+    "json": generate_shopping_cart_json,
+}
+
+
+def generate_shopping_cart(
+    ingredients: Iterable[dict], file_format: str = "txt"
+) -> Iterator[bytes]:
+    for chunk in SHOPPING_CART_FORMATS[file_format](ingredients):
+        yield chunk.encode()
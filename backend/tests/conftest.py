@@ -0,0 +1,59 @@
+import io
+import os
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+
+from recipes.models import Recipe
+from users.models import User
+
+SCALES = {
+    "small": {"users": 200, "recipes": 2_000, "favorites": 20_000},
+    "full": {"users": 10_000, "recipes": 100_000, "favorites": 1_000_000},
+}
+SCALE = SCALES[os.getenv("PERF_SCALE", "small")]
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        call_command("seed_load", seed=42, stdout=io.StringIO(), **SCALE)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Откат транзакции теста не откатывает версии и снимки в кэше."""
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(db):
+    """Самый активный пользователь: у него больше всего подписок,
+    избранного и рецептов в списке покупок."""
+    user = (
+        User.objects.annotate(favorites=Count("favorite_subscriber"))
+        .order_by("-favorites", "pk")
+        .first()
+    )
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+@pytest.fixture
+def recipe_id(db):
+    return Recipe.objects.order_by("-favorites_count").values_list(
+        "pk", flat=True
+    )[0]
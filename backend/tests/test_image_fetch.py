@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from recipes.image_fetch import ImageFetcher, ImageFetchError
+from recipes.models import Recipe
+from recipes.storage import ContentAddressedStorage
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"0" * 100
+MAX_BYTES = 1000
+READ_TIMEOUT = 0.2
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Локальная замена внешнего сервера с картинками."""
+
+    routes = {
+        "/image.png": ("image/png", IMAGE, True),
+        "/copy.png": ("image/png", IMAGE, True),
+        "/photo.jpg": ("image/jpeg", IMAGE, True),
+        "/page.html": ("text/html", b"<html></html>", True),
+        "/big.png": ("image/png", b"0" * (MAX_BYTES + 1), True),
+        "/stream.png": ("image/png", b"0" * (MAX_BYTES * 3), False),
+    }
+
+    def do_GET(self) -> None:
+        if self.path == "/slow.png":
+            time.sleep(READ_TIMEOUT * 5)
+        content_type, body, with_length = self.routes.get(
+            self.path, ("image/png", IMAGE, True)
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if with_length:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    return ImageFetcher(
+        max_bytes=MAX_BYTES,
+        timeout=(1, READ_TIMEOUT),
+        max_workers=2,
+        storage=ContentAddressedStorage(location=tmp_path),
+    )
+
+
+def test_same_content_is_stored_once(server, fetcher, tmp_path):
+    name = fetcher.fetch(f"{server}/image.png")
+    os.utime(tmp_path / name, (0, 0))
+    assert fetcher.fetch(f"{server}/copy.png") == name
+    assert name.startswith("recipes/") and name.endswith(".png")
+    assert len(list((tmp_path / "recipes").iterdir())) == 1
+    assert (tmp_path / name).read_bytes() == IMAGE
+    assert (tmp_path / name).stat().st_mtime > 0
+
+
+def test_extension_matches_data_url_uploads(server, fetcher):
+    assert fetcher.fetch(f"{server}/photo.jpg").endswith(".jpeg")
+
+
+def test_default_storage_is_recipe_image_storage():
+    fetcher = ImageFetcher(max_bytes=MAX_BYTES, timeout=(1, 1), max_workers=1)
+    assert fetcher.storage is Recipe._meta.get_field("image").storage
+
+
+@pytest.mark.parametrize(
+    "path,message",
+    (
+        ("/page.html", "unsupported"),
+        ("/big.png", "too big"),
+        ("/stream.png", f"more than {MAX_BYTES} bytes"),
+    ),
+)
+def test_rejected_responses(server, fetcher, tmp_path, path, message):
+    with pytest.raises(ImageFetchError, match=message):
+        fetcher.fetch(f"{server}{path}")
+    assert not (tmp_path / "recipes").exists()
+
+
+def test_read_timeout(server, fetcher):
+    started = time.monotonic()
+    with pytest.raises(ImageFetchError):
+        fetcher.fetch(f"{server}/slow.png")
+    assert time.monotonic() - started < READ_TIMEOUT * 5 * 3
+
+
+def test_fetch_many_reports_errors_per_url(server, fetcher):
+    results = fetcher.fetch_many(
+        [f"{server}/image.png", f"{server}/page.html"]
+    )
+    assert isinstance(results[f"{server}/image.png"], str)
+    assert isinstance(results[f"{server}/page.html"], ImageFetchError)
@@ -0,0 +1,118 @@
+import io
+import json
+import re
+
+import pytest
+
+from django.core.management import call_command
+
+from recipes.models import Recipe, ShoppingListItem, Tag, Wishlist
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import User
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create_user(
+        username="importer",
+        email="importer@example.com",
+        first_name="Имя",
+        last_name="Фамилия",
+        password="password",
+    )
+
+
+@pytest.fixture
+def recipes(author):
+    slug = Tag.objects.values_list("slug", flat=True).first()
+    return [
+        {
+            "author": author.username,
+            "name": f"Импортированный рецепт {number}",
+            "text": "Текст",
+            "cooking_time": 10 + number,
+            "tags": [slug],
+            "ingredients": [
+                {
+                    "name": "импортная мука",
+                    "measurement_unit": "г",
+                    "amount": 100,
+                },
+                {
+                    "name": f"импортная специя {number}",
+                    "measurement_unit": "г.",
+                    "amount": number + 1,
+                },
+            ],
+        }
+        for number in range(3)
+    ]
+
+
+def import_recipes(path, recipes: list) -> tuple:
+    """Пишет файл в формате по расширению, импортирует и возвращает
+    (создано, обновлено) из итоговой строки команды."""
+    with open(path, "w", encoding="utf-8") as file:
+        if path.suffix == ".jsonl":
+            file.writelines(
+                json.dumps(recipe, ensure_ascii=False) + "\n"
+                for recipe in recipes
+            )
+        else:
+            json.dump(recipes, file, ensure_ascii=False)
+    stdout = io.StringIO()
+    call_command("import_data", path, "--model", "recipes", stdout=stdout)
+    created, updated = re.search(
+        r"(\d+) created, (\d+) updated", stdout.getvalue()
+    ).groups()
+    return int(created), int(updated)
+
+
+def shopping_list(user: User) -> dict:
+    return dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            "ingredient__name", "total_amount"
+        )
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("extension", ("json", "jsonl"))
+def test_second_run_changes_nothing(tmp_path, author, recipes, extension):
+    path = tmp_path / f"recipes.{extension}"
+    assert import_recipes(path, recipes) == (3, 0)
+    author.refresh_from_db()
+    assert author.recipes_count == 3
+    updated = dict(
+        Recipe.objects.filter(author=author).values_list("pk", "updated")
+    )
+    assert import_recipes(path, recipes) == (0, 0)
+    author.refresh_from_db()
+    assert author.recipes_count == 3
+    assert (
+        dict(Recipe.objects.filter(author=author).values_list("pk", "updated"))
+        == updated
+    )
+
+
+@pytest.mark.django_db
+def test_changed_ingredients_update_shopping_lists(tmp_path, author, recipes):
+    path = tmp_path / "recipes.json"
+    import_recipes(path, recipes)
+    shopper = User.objects.exclude(pk=author.pk).order_by("pk").first()
+    wishlisted = Recipe.objects.get(author=author, name=recipes[0]["name"])
+    Wishlist.objects.create(user=shopper, recipe=wishlisted)
+    rebuild_shopping_lists([shopper.id])
+    before = shopping_list(shopper)
+    assert before["импортная мука"] == 100
+    recipes[0]["ingredients"] = [
+        {"name": "импортная мука", "measurement_unit": "г", "amount": 250},
+        {"name": "импортная соль", "measurement_unit": "г", "amount": 5},
+    ]
+    assert import_recipes(path, recipes) == (0, 1)
+    after = shopping_list(shopper)
+    assert after["импортная мука"] == 250
+    assert after["импортная соль"] == 5
+    assert "импортная специя 0" not in after
+    rebuild_shopping_lists([shopper.id])
+    assert shopping_list(shopper) == after
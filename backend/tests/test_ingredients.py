@@ -0,0 +1,26 @@
+import pytest
+
+from recipes.models import Ingredient, MeasurementUnit
+
+
+@pytest.mark.django_db
+def test_index_and_etag_follow_committed_writes(
+    anonymous_client, django_capture_on_commit_callbacks
+):
+    url = "/api/ingredients/?name=зззтестовый"
+    before = anonymous_client.get(url)
+    assert before.json() == []
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        Ingredient.objects.create(
+            name="зззтестовый",
+            measurement_unit=MeasurementUnit.objects.get(name="г"),
+        )
+    uncommitted = anonymous_client.get(url)
+    assert uncommitted["ETag"] == before["ETag"]
+    assert uncommitted.json() == []
+    for callback in callbacks:
+        callback()
+    after = anonymous_client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+    assert after.status_code == 200
+    assert after["ETag"] != before["ETag"]
+    assert [item["name"] for item in after.json()] == ["зззтестовый"]
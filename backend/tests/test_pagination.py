@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ("", "-created", "created"))
+def test_cursor_follows_created_ordering(anonymous_client, ordering):
+    response = anonymous_client.get(
+        "/api/recipes/", {"cursor": "", "ordering": ordering}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert "count" not in data
+    next_page = anonymous_client.get(data["next"])
+    assert next_page.status_code == 200
+    ids = {recipe["id"] for recipe in data["results"]}
+    assert ids.isdisjoint(
+        recipe["id"] for recipe in next_page.json()["results"]
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ("-favorites", "cooking_time"))
+def test_cursor_rejects_non_unique_ordering(anonymous_client, ordering):
+    response = anonymous_client.get(
+        "/api/recipes/", {"cursor": "", "ordering": ordering}
+    )
+    assert response.status_code == 400
+    assert "cursor" in response.json()
+
+
+@pytest.mark.django_db
+def test_page_number_allows_any_ordering(anonymous_client):
+    response = anonymous_client.get(
+        "/api/recipes/", {"ordering": "-favorites"}
+    )
+    assert response.status_code == 200
+    assert "count" in response.json()
@@ -0,0 +1,158 @@
+"""Бюджеты запросов к базе и задержки для основных эндпоинтов.
+
+Каждый запрос выполняется с пустым кэшем, поэтому измеряется
+холодный путь. Число запросов не должно зависеть от объёма данных:
+N+1 в сериализаторе сразу выводит эндпоинт за бюджет.
+
+Объём данных задаётся PERF_SCALE (small/full), повторы — PERF_REPEAT,
+а PERF_LATENCY_FACTOR масштабирует бюджеты задержки под медленную
+машину.
+"""
+import gc
+import os
+import time
+
+import pytest
+from rest_framework.pagination import PageNumberPagination
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+REPEAT = int(os.getenv("PERF_REPEAT", 20))
+LATENCY_FACTOR = float(os.getenv("PERF_LATENCY_FACTOR", 1))
+
+
+def measure(client, url: str) -> tuple:
+    """Максимум запросов и p95 времени ответа в миллисекундах.
+
+    Сборщик мусора на время замеров отключён: его паузы зависят
+    от всего процесса, а не от измеряемого эндпоинта.
+    """
+    client.get(url)
+    queries, timings = [], []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(REPEAT):
+            measure_once(client, url, queries, timings)
+    finally:
+        gc.enable()
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return max(queries), p95
+
+
+def measure_once(client, url: str, queries: list, timings: list) -> None:
+    cache.clear()
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        timings.append((time.perf_counter() - started) * 1000)
+    assert response.status_code == 200, response.content[:200]
+    queries.append(len(captured))
+
+
+ENDPOINTS = (
+    # id, клиент, URL, запросов, p95 в мс
+    ("recipes-anonymous", "anonymous_client", "/api/recipes/", 4, 300),
+    ("recipes", "user_client", "/api/recipes/", 6, 300),
+    (
+        "recipes-filtered",
+        "user_client",
+        "/api/recipes/?is_favorited=1&tags=breakfast&tags=lunch",
+        7,
+        300,
+    ),
+    (
+        "recipes-ordered",
+        "anonymous_client",
+        "/api/recipes/?ordering=-favorites",
+        4,
+        300,
+    ),
+    (
+        "recipe-anonymous",
+        "anonymous_client",
+        "/api/recipes/{recipe_id}/",
+        4,
+        150,
+    ),
+    ("recipe", "user_client", "/api/recipes/{recipe_id}/", 5, 150),
+    (
+        "subscriptions",
+        "user_client",
+        "/api/users/subscriptions/?recipes_limit=3",
+        5,
+        300,
+    ),
+    (
+        "ingredients-search",
+        "anonymous_client",
+        "/api/ingredients/?name=мук",
+        1,
+        150,
+    ),
+    (
+        "download-shopping-cart",
+        "user_client",
+        "/api/recipes/download_shopping_cart/",
+        2,
+        150,
+    ),
+)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "client_fixture,url,max_queries,p95_budget",
+    [endpoint[1:] for endpoint in ENDPOINTS],
+    ids=[endpoint[0] for endpoint in ENDPOINTS],
+)
+def test_endpoint_budget(
+    request, recipe_id, client_fixture, url, max_queries, p95_budget
+):
+    client = request.getfixturevalue(client_fixture)
+    queries, p95 = measure(client, url.format(recipe_id=recipe_id))
+    assert queries <= max_queries, f"{queries} queries, budget {max_queries}"
+    budget = p95_budget * LATENCY_FACTOR
+    assert p95 <= budget, f"p95 {p95:.1f} ms, budget {budget:.0f} ms"
+
+
+@pytest.mark.django_db
+def test_queries_do_not_grow_with_recipes_limit(user_client):
+    small_queries, _ = measure(
+        user_client, "/api/users/subscriptions/?recipes_limit=1"
+    )
+    large_queries, _ = measure(
+        user_client, "/api/users/subscriptions/?recipes_limit=10"
+    )
+    assert small_queries == large_queries
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "client_fixture,url",
+    (
+        ("anonymous_client", "/api/recipes/"),
+        ("user_client", "/api/recipes/"),
+        ("user_client", "/api/recipes/?is_favorited=1"),
+        ("user_client", "/api/recipes/?is_in_shopping_cart=1"),
+        ("user_client", "/api/users/subscriptions/?recipes_limit=3"),
+    ),
+)
+def test_queries_do_not_grow_with_page_size(
+    request, monkeypatch, client_fixture, url
+):
+    """Размер страницы берётся из PAGE_SIZE при импорте DRF, поэтому
+    меняется атрибут класса, а не настройки."""
+    client = request.getfixturevalue(client_fixture)
+    queries = {}
+    for page_size in (1, 20):
+        monkeypatch.setattr(PageNumberPagination, "page_size", page_size)
+        cache.clear()
+        assert len(client.get(url).json()["results"]) == page_size
+        queries[page_size], _ = measure(client, url)
+    assert queries[1] == queries[20]
@@ -0,0 +1,92 @@
+import pytest
+
+from recipes.cache import get_recipe_payload_keys
+from recipes.models import Recipe, RecipeIngredient
+from users.models import User
+
+
+def payload_key(recipe: Recipe) -> str:
+    return get_recipe_payload_keys([recipe], "testserver")[recipe.id]
+
+
+@pytest.fixture
+def recipes(db):
+    first = Recipe.objects.order_by("pk").first()
+    other = Recipe.objects.exclude(author=first.author).order_by("pk").first()
+    return first, other
+
+
+@pytest.mark.django_db
+def test_signup_keeps_recipe_payloads(
+    anonymous_client, recipes, django_capture_on_commit_callbacks
+):
+    before = [payload_key(recipe) for recipe in recipes]
+    with django_capture_on_commit_callbacks(execute=True):
+        response = anonymous_client.post(
+            "/api/users/",
+            {
+                "email": "newcomer@example.com",
+                "username": "newcomer",
+                "first_name": "Имя",
+                "last_name": "Фамилия",
+                "password": "Sup3r-Str0ng-Pass",
+            },
+        )
+    assert response.status_code == 201
+    assert [payload_key(recipe) for recipe in recipes] == before
+
+
+@pytest.mark.django_db
+def test_profile_edit_changes_only_author_payloads(
+    anonymous_client, recipes, django_capture_on_commit_callbacks
+):
+    recipe, other = recipes
+    before = payload_key(recipe), payload_key(other)
+    etag = anonymous_client.get(f"/api/recipes/{recipe.id}/")["ETag"]
+    author = User.objects.get(pk=recipe.author_id)
+    author.first_name = "Другое"
+    with django_capture_on_commit_callbacks(execute=True):
+        author.save()
+    assert payload_key(recipe) != before[0]
+    assert payload_key(other) == before[1]
+    response = anonymous_client.get(
+        f"/api/recipes/{recipe.id}/", HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == 200
+    assert response.json()["author"]["first_name"] == "Другое"
+
+
+@pytest.mark.django_db
+def test_recipe_version_changes_after_commit(
+    recipes, django_capture_on_commit_callbacks
+):
+    recipe, _ = recipes
+    before = payload_key(recipe)
+    with django_capture_on_commit_callbacks() as callbacks:
+        recipe.name = "Новое название"
+        recipe.save()
+        recipe.tags.clear()
+        recipe.recipes_ingredient.first().delete()
+    assert payload_key(recipe) == before
+    for callback in callbacks:
+        callback()
+    assert payload_key(recipe) != before
+
+
+@pytest.mark.django_db
+def test_ingredient_edit_changes_recipe_etag(
+    anonymous_client, recipes, django_capture_on_commit_callbacks
+):
+    recipe, _ = recipes
+    url = f"/api/recipes/{recipe.id}/"
+    etag = anonymous_client.get(url)["ETag"]
+    row = RecipeIngredient.objects.filter(recipe=recipe).first()
+    row.amount += 1
+    with django_capture_on_commit_callbacks(execute=True):
+        row.save()
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    amounts = {
+        item["id"]: item["amount"] for item in response.json()["ingredients"]
+    }
+    assert amounts[row.ingredient_id] == row.amount
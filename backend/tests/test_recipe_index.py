@@ -0,0 +1,114 @@
+import pytest
+from rest_framework.test import APIClient
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.recipe_index import CHANGE_SEQUENCE_KEY, recipe_index
+
+
+@pytest.fixture
+def recipe(db):
+    return Recipe.objects.order_by("pk").first()
+
+
+@pytest.fixture
+def author_client(recipe):
+    client = APIClient()
+    client.force_authenticate(recipe.author)
+    return client
+
+
+def matched_ids(ingredient_id: int) -> set:
+    return {
+        recipe_id
+        for recipe_id, _, _ in recipe_index.match({ingredient_id})[:100_000]
+    }
+
+
+@pytest.mark.django_db
+def test_recipe_edit_is_applied_incrementally(
+    recipe, author_client, django_capture_on_commit_callbacks
+):
+    old_id = recipe.recipes_ingredient.first().ingredient_id
+    new_id = (
+        Ingredient.objects.exclude(recipes=recipe)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    assert recipe.id in matched_ids(old_id)
+    version = recipe_index._version
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.patch(
+            f"/api/recipes/{recipe.id}/",
+            {
+                "ingredients": [{"id": new_id, "amount": 10}],
+                "tags": list(recipe.tags.values_list("pk", flat=True)),
+            },
+            format="json",
+        )
+    assert response.status_code == 200, response.content
+    with CaptureQueriesContext(connection) as captured:
+        assert recipe.id in matched_ids(new_id)
+    assert recipe.id not in matched_ids(old_id)
+    assert recipe_index._version == version
+    assert len(captured) == 1
+    matches = recipe_index.match({new_id})
+    assert matches.totals[recipe.id] == 1
+
+
+@pytest.mark.django_db
+def test_recipe_text_edit_keeps_index(
+    recipe, django_capture_on_commit_callbacks
+):
+    ingredient_id = recipe.recipes_ingredient.first().ingredient_id
+    matched_ids(ingredient_id)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.name = "Другое название"
+        recipe.save()
+    with CaptureQueriesContext(connection) as captured:
+        assert recipe.id in matched_ids(ingredient_id)
+    assert not captured
+
+
+@pytest.mark.django_db
+def test_recipe_delete_removes_it(
+    recipe, author_client, django_capture_on_commit_callbacks
+):
+    ingredient_id = recipe.recipes_ingredient.first().ingredient_id
+    matched_ids(ingredient_id)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert (
+            author_client.delete(f"/api/recipes/{recipe.id}/").status_code
+            == 204
+        )
+    assert recipe.id not in matched_ids(ingredient_id)
+
+
+@pytest.mark.django_db
+def test_removing_many_rows_publishes_one_change(
+    recipe, author_client, django_capture_on_commit_callbacks
+):
+    kept, *removed = Ingredient.objects.order_by("pk")[:25]
+    RecipeIngredient.objects.filter(recipe=recipe).delete()
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in (kept, *removed)
+    )
+    matched_ids(kept.id)
+    sequence = cache.get(CHANGE_SEQUENCE_KEY, 0)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.patch(
+            f"/api/recipes/{recipe.id}/",
+            {"ingredients": [{"id": kept.id, "amount": 2}], "tags": []},
+            format="json",
+        )
+    assert response.status_code == 200, response.content
+    assert cache.get(CHANGE_SEQUENCE_KEY) == sequence + 1
+    assert recipe.id not in matched_ids(removed[0].id)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.delete(f"/api/recipes/{recipe.id}/")
+    assert cache.get(CHANGE_SEQUENCE_KEY) == sequence + 2
+    assert recipe.id not in matched_ids(kept.id)
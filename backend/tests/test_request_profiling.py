@@ -0,0 +1,61 @@
+import json
+import logging
+
+import pytest
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.test import APIClient
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+LOGGER = "foodgram.middleware"
+
+
+def get_records(caplog, level: int) -> list:
+    return [
+        json.loads(record.getMessage())
+        for record in caplog.records
+        if record.name == LOGGER and record.levelno == level
+    ]
+
+
+@pytest.mark.django_db
+def test_disabled_by_default(anonymous_client):
+    response = anonymous_client.get("/api/recipes/")
+    assert "Server-Timing" not in response
+
+
+@pytest.mark.django_db
+@override_settings(REQUEST_PROFILING=True)
+def test_server_timing_and_log(caplog):
+    cache.clear()
+    caplog.set_level(logging.INFO, logger=LOGGER)
+    client = APIClient()
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get("/api/recipes/")
+    timing = response["Server-Timing"]
+    assert f'desc="{len(captured)} queries"' in timing
+    assert "app;dur=" in timing
+    (record,) = get_records(caplog, logging.INFO)
+    assert record["view"] == "api.v1.views.RecipeViewSet.list"
+    assert record["queries"] == len(captured)
+    assert record["size"] == len(response.content)
+    assert record["app_ms"] > 0
+    assert not hasattr(Serializer.data.fget, "__wrapped__")
+    assert not hasattr(ListSerializer.data.fget, "__wrapped__")
+
+
+@pytest.mark.django_db
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_DUPLICATES=2)
+def test_streaming_response_is_logged_after_body(user_client, caplog):
+    caplog.set_level(logging.INFO, logger=LOGGER)
+    response = user_client.get("/api/recipes/download_shopping_cart/")
+    assert not get_records(caplog, logging.INFO)
+    content = b"".join(response.streaming_content)
+    (record,) = get_records(caplog, logging.INFO)
+    assert record["view"] == (
+        "api.v1.views.RecipeViewSet.download_shopping_cart"
+    )
+    assert record["size"] == len(content)
+    assert record["duplicate_queries"] == 0
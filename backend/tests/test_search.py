@@ -0,0 +1,67 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes import search
+from recipes.models import Ingredient, Recipe
+
+
+@pytest.fixture
+def vector_updates(monkeypatch):
+    """Число пересчётов поискового вектора: каждый начинается
+    с проверки is_supported."""
+    calls = []
+    monkeypatch.setattr(
+        search, "is_supported", lambda: calls.append(1) and False
+    )
+    return calls
+
+
+def png_data_url() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(buffer, "PNG")
+    return (
+        "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@pytest.mark.django_db
+def test_search_vector_is_updated_once_per_recipe(
+    vector_updates, settings, tmp_path
+):
+    settings.MEDIA_ROOT = tmp_path
+    recipe = Recipe.objects.order_by("pk").first()
+    client = APIClient()
+    client.force_authenticate(recipe.author)
+    ingredients = [
+        {"id": ingredient_id, "amount": 1}
+        for ingredient_id in Ingredient.objects.exclude(
+            recipes=recipe
+        ).values_list("pk", flat=True)[:10]
+    ]
+    response = client.post(
+        "/api/recipes/",
+        {
+            "name": "Новый рецепт",
+            "text": "Текст",
+            "cooking_time": 10,
+            "image": png_data_url(),
+            "ingredients": ingredients,
+            "tags": [],
+        },
+        format="json",
+    )
+    assert response.status_code == 201, response.content
+    assert len(vector_updates) == 1
+    response = client.patch(
+        f"/api/recipes/{recipe.id}/",
+        {"ingredients": ingredients, "tags": []},
+        format="json",
+    )
+    assert response.status_code == 200, response.content
+    assert len(vector_updates) == 2
+    assert client.delete(f"/api/recipes/{recipe.id}/").status_code == 204
+    assert len(vector_updates) == 2
@@ -0,0 +1,201 @@
+import json
+import tracemalloc
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, ShoppingListItem, Wishlist,
+)
+from recipes.shopping_list import rebuild_shopping_lists, update_shopping_lists
+from users.models import User
+
+
+@pytest.fixture
+def new_user(db):
+    return User.objects.create_user(
+        username="shopper",
+        email="shopper@example.com",
+        first_name="Имя",
+        last_name="Фамилия",
+        password="password",
+    )
+
+
+@pytest.fixture
+def new_user_client(new_user):
+    client = APIClient()
+    token = Token.objects.create(user=new_user)
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def fill_cart(user: User, recipes: int) -> None:
+    Wishlist.objects.filter(user=user).delete()
+    Wishlist.objects.bulk_create(
+        Wishlist(user=user, recipe_id=recipe_id)
+        for recipe_id in Recipe.objects.order_by("pk").values_list(
+            "pk", flat=True
+        )[:recipes]
+    )
+    rebuild_shopping_lists([user.id])
+
+
+def stream_peak(client: APIClient, file_format: str) -> tuple:
+    """Пик памяти (tracemalloc) за запрос и чтение ответа по частям,
+    и размер ответа в байтах."""
+    tracemalloc.start()
+    try:
+        response = client.get(
+            "/api/recipes/download_shopping_cart/", {"format": file_format}
+        )
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        return tracemalloc.get_traced_memory()[1], size
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("file_format", ("txt", "csv", "json"))
+def test_download_memory_is_flat(new_user, new_user_client, file_format):
+    """Корзина из сотен рецептов выгружается потоком: пик памяти почти
+    не растёт вместе с размером ответа."""
+    results = {}
+    for recipes in (500, 2000):
+        fill_cart(new_user, recipes)
+        stream_peak(new_user_client, file_format)
+        results[recipes] = stream_peak(new_user_client, file_format)
+    (small_peak, small_size), (large_peak, large_size) = results.values()
+    assert large_size > small_size * 1.5
+    assert large_peak - small_peak < (large_size - small_size) / 4
+
+
+def shopping_list(user: User) -> dict:
+    return dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            "ingredient_id", "total_amount"
+        )
+    )
+
+
+def rebuilt(user: User) -> dict:
+    """Эталон: список, пересобранный с нуля из корзины."""
+    rebuild_shopping_lists([user.id])
+    return shopping_list(user)
+
+
+@pytest.fixture
+def two_recipes(new_user):
+    first, second, third = Ingredient.objects.order_by("pk").values_list(
+        "pk", flat=True
+    )[:3]
+    recipes = []
+    for name, amounts in (
+        ("Первый", {first: 100, second: 50}),
+        ("Второй", {second: 30, third: 5}),
+    ):
+        recipe = Recipe.objects.create(
+            author=new_user, name=name, text="Текст", cooking_time=10
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+        )
+        recipes.append(recipe)
+    return recipes, (first, second, third)
+
+
+@pytest.mark.django_db
+def test_cart_toggles_merge_and_delete_at_zero(
+    new_user, new_user_client, two_recipes
+):
+    (recipe, other), (first, second, third) = two_recipes
+    url = "/api/recipes/{}/shopping_cart/"
+    assert new_user_client.post(url.format(recipe.id)).status_code == 201
+    assert shopping_list(new_user) == {first: 100, second: 50}
+    assert new_user_client.post(url.format(other.id)).status_code == 201
+    assert shopping_list(new_user) == {first: 100, second: 80, third: 5}
+    assert new_user_client.delete(url.format(recipe.id)).status_code == 204
+    assert shopping_list(new_user) == {second: 30, third: 5}
+    assert new_user_client.delete(url.format(other.id)).status_code == 204
+    assert shopping_list(new_user) == {}
+
+
+@pytest.mark.django_db
+def test_recipe_edit_updates_every_cart(
+    new_user, new_user_client, user_client, two_recipes
+):
+    (recipe, other), (first, second, third) = two_recipes
+    for client in (new_user_client, user_client):
+        for cart_recipe in (recipe, other):
+            client.post(f"/api/recipes/{cart_recipe.id}/shopping_cart/")
+    response = new_user_client.patch(
+        f"/api/recipes/{recipe.id}/",
+        {
+            "ingredients": [
+                {"id": second, "amount": 20},
+                {"id": third, "amount": 1},
+            ],
+            "tags": [],
+        },
+        format="json",
+    )
+    assert response.status_code == 200, response.content
+    assert shopping_list(new_user) == {second: 50, third: 6}
+    users = User.objects.filter(wishlist_subscriber__recipe=recipe)
+    for user in users:
+        expected = shopping_list(user)
+        assert rebuilt(user) == expected
+
+
+@pytest.mark.django_db
+def test_recipe_delete_removes_its_amounts(
+    new_user, new_user_client, two_recipes
+):
+    (recipe, other), (_, second, third) = two_recipes
+    for cart_recipe in (recipe, other):
+        new_user_client.post(f"/api/recipes/{cart_recipe.id}/shopping_cart/")
+    assert (
+        new_user_client.delete(f"/api/recipes/{recipe.id}/").status_code == 204
+    )
+    assert shopping_list(new_user) == {second: 30, third: 5}
+
+
+@pytest.mark.django_db
+def test_concurrent_inserts_of_new_item_add_up(new_user, monkeypatch):
+    """Параллельная транзакция создаёт ту же позицию между проверкой
+    и вставкой: её количество не теряется, а складывается с нашим."""
+    ingredient_id = Ingredient.objects.order_by("pk").values_list(
+        "pk", flat=True
+    )[0]
+    bulk_create = ShoppingListItem.objects.bulk_create
+
+    def racing_bulk_create(objs, **kwargs):
+        monkeypatch.setattr(
+            ShoppingListItem.objects, "bulk_create", bulk_create
+        )
+        update_shopping_lists([new_user.id], {ingredient_id: 30})
+        return bulk_create(objs, **kwargs)
+
+    monkeypatch.setattr(
+        ShoppingListItem.objects, "bulk_create", racing_bulk_create
+    )
+    update_shopping_lists([new_user.id], {ingredient_id: 100})
+    assert shopping_list(new_user) == {ingredient_id: 130}
+    update_shopping_lists([new_user.id], {ingredient_id: 20})
+    assert shopping_list(new_user) == {ingredient_id: 150}
+
+
+@pytest.mark.django_db
+def test_cart_view_matches_json_download(new_user_client, two_recipes):
+    (recipe, other), _ = two_recipes
+    for cart_recipe in (recipe, other):
+        new_user_client.post(f"/api/recipes/{cart_recipe.id}/shopping_cart/")
+    items = new_user_client.get("/api/recipes/shopping_cart/").json()
+    response = new_user_client.get(
+        "/api/recipes/download_shopping_cart/", {"format": "json"}
+    )
+    assert json.loads(b"".join(response.streaming_content)) == items
+    assert {"name", "measurement_unit", "total_amount"} == set(items[0])
@@ -0,0 +1,65 @@
+import io
+import os
+import time
+
+import pytest
+
+from django.core.management import call_command
+
+from recipes.models import Recipe
+
+OLD = time.time() - 48 * 3600
+
+
+@pytest.fixture
+def media(db, settings, tmp_path):
+    """Картинка рецепта с превью, сирота с превью и свежая сирота."""
+    settings.MEDIA_ROOT = tmp_path
+    recipe = Recipe.objects.order_by("pk").first()
+    Recipe.objects.filter(pk=recipe.pk).update(image="recipes/kept.png")
+    paths = {}
+    for key, name in (
+        ("kept", "recipes/kept.png"),
+        ("orphan", "recipes/orphan.png"),
+        ("recent", "recipes/recent.png"),
+        ("kept_renditions", "recipes/renditions/kept.png/small.webp"),
+        ("orphan_renditions", "recipes/renditions/orphan.png/small.webp"),
+    ):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"0" * 10)
+        paths[key] = path
+    for key in ("kept", "orphan", "kept_renditions", "orphan_renditions"):
+        os.utime(paths[key], (OLD, OLD))
+    for key in ("kept_renditions", "orphan_renditions"):
+        os.utime(paths[key].parent, (OLD, OLD))
+    return paths
+
+
+def sweep(*args) -> str:
+    stdout = io.StringIO()
+    call_command("sweep_media", *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+def test_orphans_are_removed(media):
+    output = sweep("--grace-hours", "24")
+    assert "Deleted 2 entries, 20 bytes" in output
+    assert media["kept"].exists()
+    assert media["kept_renditions"].exists()
+    assert media["recent"].exists()
+    assert not media["orphan"].exists()
+    assert not media["orphan_renditions"].parent.exists()
+
+
+def test_grace_hours_keeps_recent_orphans(media):
+    sweep("--grace-hours", "0")
+    assert not media["recent"].exists()
+    assert media["kept"].exists()
+    assert media["kept_renditions"].exists()
+
+
+def test_dry_run_deletes_nothing(media):
+    output = sweep("--dry-run", "--grace-hours", "0")
+    assert "Would delete 3 entries" in output
+    assert all(path.exists() for path in media.values())